@@ -1,25 +1,72 @@
-import os
 import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pathlib import Path
+
+# Make the backend package (app.*) importable when run as a Vercel function
+BACKEND_DIR = str(Path(__file__).resolve().parents[1])
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
 
 from app.db import db_cursor
 import json
+import threading
+import time
 
-def handler(request):
-    """Health check endpoint"""
+# Probes within the TTL are served from memory. Between the TTL and the stale
+# window the cached result is returned immediately while a background thread
+# refreshes it; past the stale window the check runs inline again.
+CACHE_TTL_SECONDS = 5.0
+STALE_TTL_SECONDS = 30.0
+
+_cache = {"ts": 0.0, "ok": True, "msg": ""}
+_refresh_lock = threading.Lock()
+
+
+def _check_database():
     try:
-        with db_cursor() as cur:
+        with db_cursor(row_factory=None) as cur:
             cur.execute("SELECT 1 as health_check")
-            result = cur.fetchone()
+            cur.fetchone()
+        return True, ""
+    except Exception as e:
+        return False, str(e)
+
+
+def _store(ok, msg):
+    _cache.update(ts=time.monotonic(), ok=ok, msg=msg)
+
 
+def _revalidate():
+    try:
+        ok, msg = _check_database()
+        # Keep serving the last good result if the refresh fails; once it ages
+        # past the stale window the next probe checks inline and reports it.
+        if ok or not _cache["ok"]:
+            _store(ok, msg)
+    finally:
+        _refresh_lock.release()
+
+
+def _response():
+    if _cache["ok"]:
         return {
             "statusCode": 200,
             "headers": {"Content-Type": "application/json"},
             "body": json.dumps({"status": "ok", "database": "connected"})
         }
-    except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps({"status": "error", "message": str(e)})
-        }
\ No newline at end of file
+    return {
+        "statusCode": 500,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps({"status": "error", "message": _cache["msg"]})
+    }
+
+
+def handler(request):
+    """Health check endpoint"""
+    age = time.monotonic() - _cache["ts"]
+    if age >= CACHE_TTL_SECONDS:
+        if _cache["ts"] and age < STALE_TTL_SECONDS:
+            if _refresh_lock.acquire(blocking=False):
+                threading.Thread(target=_revalidate, daemon=True).start()
+        else:
+            _store(*_check_database())
+    return _response()
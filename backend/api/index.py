@@ -1,12 +1,45 @@
-import os
+import asyncio
+import inspect
 import sys
+from functools import cache
+from pathlib import Path
 
 from fastapi import FastAPI
 
 # Ensure we can import the backend package (app.main) when running on Vercel
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BACKEND_DIR = str(Path(__file__).resolve().parents[1])
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
 
-from app.main import app as main_app
+
+@cache
+def _main_app():
+    # Imported on first request so a cold container can start serving
+    # before the full application module has been loaded
+    from app.main import app as main_app
+    return main_app
+
+
+# Mounted apps get no lifespan events, so the backend's startup hook (database
+# init + seed) is run once here, by whichever request reaches it first
+_startup_task = None
+
+
+async def _run_startup_handlers(main_app):
+    for handler in main_app.router.on_startup:
+        result = handler()
+        if inspect.isawaitable(result):
+            await result
+
+
+async def _lazy_main_app(scope, receive, send):
+    global _startup_task
+    main_app = _main_app()
+    if _startup_task is None:
+        _startup_task = asyncio.ensure_future(_run_startup_handlers(main_app))
+    if not _startup_task.done():
+        await asyncio.shield(_startup_task)
+    await main_app(scope, receive, send)
 
 
 # Create a small wrapper app mounted at /api so that requests to
@@ -14,4 +47,4 @@ from app.main import app as main_app
 # defined in app.main, whose routes are declared without the /api
 # prefix (e.g. "/health", "/projects").
 app = FastAPI()
-app.mount("/api", main_app)
\ No newline at end of file
+app.mount("/api", _lazy_main_app)
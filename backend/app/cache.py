@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+# Read endpoints are polled by the dashboard far more often than the data
+# changes. Entries expire after the TTL; writes in this process also drop the
+# affected project's entries right away (other workers catch up on expiry).
+CACHE_TTL_SECONDS = 30.0
+CACHE_MAX_ENTRIES = 1024
+
+_MISS = object()
+
+# (handler name, project tag, arguments) -> (expires_at, value), in LRU order
+_entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+# Key -> future of the call currently computing it. A dashboard load fires
+# several identical requests at once; only the first one runs the handler.
+_inflight: dict[tuple, Any] = {}
+# Project tag -> number of invalidations, so a result computed across a
+# write is returned to its callers but not cached
+_generations: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _get(key: tuple) -> Any:
+    with _lock:
+        hit = _entries.get(key)
+        if hit is None:
+            return _MISS
+        if hit[0] < time.monotonic():
+            del _entries[key]
+            return _MISS
+        _entries.move_to_end(key)
+        return hit[1]
+
+
+def _join_or_lead(key: tuple, new_future: Callable[[], Any]) -> tuple[Any, bool, int]:
+    """Return (future, is_leader, generation) for a cache miss on key"""
+    with _lock:
+        fut = _inflight.get(key)
+        if fut is not None:
+            return fut, False, 0
+        fut = _inflight[key] = new_future()
+        return fut, True, _generations.get(key[1], 0)
+
+
+def _finish(key: tuple, fut: Any, generation: int, value: Any = _MISS) -> None:
+    with _lock:
+        if _inflight.get(key) is fut:
+            del _inflight[key]
+        if value is _MISS or _generations.get(key[1], 0) != generation:
+            return
+        _entries[key] = (time.monotonic() + CACHE_TTL_SECONDS, value)
+        _entries.move_to_end(key)
+        while len(_entries) > CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def cached(fn: Callable) -> Callable:
+    """Memoize a read handler on its arguments.
+
+    Entries are tagged with the handler's project_id argument (if any) so
+    invalidate() can drop everything cached for one project. Concurrent
+    misses on the same key share a single call.
+    """
+    sig = inspect.signature(fn)
+
+    def key_for(args: tuple, kwargs: dict) -> tuple:
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple(bound.arguments.items())
+        return (fn.__name__, str(bound.arguments.get("project_id")), arguments)
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            key = key_for(args, kwargs)
+            while True:
+                value = _get(key)
+                if value is not _MISS:
+                    return value
+                fut, leader, generation = _join_or_lead(key, asyncio.get_running_loop().create_future)
+                if leader:
+                    break
+                try:
+                    return await asyncio.shield(fut)
+                except asyncio.CancelledError:
+                    # The leader's request was cancelled, not ours: go again
+                    # and join (or become) the next leader
+                    if fut.cancelled():
+                        continue
+                    raise
+            try:
+                value = await fn(*args, **kwargs)
+            except asyncio.CancelledError:
+                # Only the leader's client went away; waiters retry the call
+                _finish(key, fut, generation)
+                fut.cancel()
+                raise
+            except BaseException as e:
+                _finish(key, fut, generation)
+                fut.set_exception(e)
+                fut.exception()  # mark retrieved when nobody was waiting
+                raise
+            _finish(key, fut, generation, value)
+            fut.set_result(value)
+            return value
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = key_for(args, kwargs)
+        value = _get(key)
+        if value is not _MISS:
+            return value
+        fut, leader, generation = _join_or_lead(key, concurrent.futures.Future)
+        if not leader:
+            return fut.result()
+        try:
+            value = fn(*args, **kwargs)
+        except BaseException as e:
+            _finish(key, fut, generation)
+            fut.set_exception(e)
+            raise
+        _finish(key, fut, generation, value)
+        fut.set_result(value)
+        return value
+
+    return wrapper
+
+
+def invalidate(project_id: Any = None) -> None:
+    """Drop cached entries for project_id, or the project-independent ones"""
+    tag = str(project_id)
+    with _lock:
+        _generations[tag] = _generations.get(tag, 0) + 1
+        for key in [k for k in _entries if k[1] == tag]:
+            del _entries[key]
+        # Later readers must not join a call that started before the write
+        for key in [k for k in _inflight if k[1] == tag]:
+            del _inflight[key]
@@ -1,54 +1,95 @@
 from __future__ import annotations
 
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConnectionFailure
-from beanie import init_beanie
+import queue
+import atexit
 import asyncio
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
 
 from .settings import settings
 
+IS_POSTGRESQL = bool(settings.database_url and settings.database_url.startswith("postgres"))
+
+# Resolved once at import. The SQL backends are synchronous and the Mongo
+# backend is async, so callers await the result when it is awaitable.
+BACKEND = "pg" if IS_POSTGRESQL else ("sqlite" if not settings.mongodb_url else "mongo")
+
+# Motor, Beanie and the ~40 document classes in models.py are only imported
+# for the Mongo backend; the SQL deployments don't pay for them at cold start
+AsyncIOMotorClient = init_beanie = None
+if BACKEND == "mongo":
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from beanie import init_beanie
+
+        from .models import (
+            Project, DailyLog, CostEntry, BudgetItem,
+            ProjectPackage, ProjectMilestone, RABill, QualityTest, NCR,
+            SafetyIncident, LabourManpower, PlantMachinery, MaterialInventory
+        )
+    except ImportError:
+        # Mongo stack not installed; init_mongodb reports the backend unavailable
+        pass
+
 # Global MongoDB client and database
 client = None
 database = None
 DB_AVAILABLE = False
 
+# _id of the document in the `meta` collection written after seeding
+SEED_MARKER_ID = "seeded"
+
+# Document models already registered with Beanie
+_initialized_models: set[type] = set()
+
+
+async def ensure_models(*models) -> None:
+    """Register document models with Beanie the first time they are needed"""
+    pending = [m for m in models if m not in _initialized_models]
+    if not pending:
+        return
+    await init_beanie(
+        database=database,
+        document_models=pending,
+        allow_index_dropping=settings.allow_index_management,
+    )
+    _initialized_models.update(pending)
+
+
 async def init_mongodb():
     """Initialize MongoDB connection"""
     global client, database, DB_AVAILABLE
     try:
-        client = AsyncIOMotorClient(settings.mongodb_url)
+        client = AsyncIOMotorClient(
+            settings.mongodb_url,
+            maxPoolSize=settings.mongodb_max_pool_size,
+            minPoolSize=settings.mongodb_min_pool_size,
+            maxIdleTimeMS=settings.mongodb_max_idle_time_ms,
+            maxConnecting=settings.mongodb_max_connecting,
+            serverSelectionTimeoutMS=settings.mongodb_server_selection_timeout_ms,
+        )
         database = client[settings.database_name]
 
         # Test the connection
         await client.admin.command('ping')
         DB_AVAILABLE = True
-        print(f"Connected to MongoDB: {settings.database_name}")
 
-        # Initialize Beanie with document models
-        from .models import (
-            Project, DailyLog, DailyActivity, CostEntry, BudgetItem,
-            ProjectPackage, ProjectMilestone, RABill, QualityTest, NCR,
-            SafetyIncident, LabourManpower, PlantMachinery, MaterialInventory,
-            DrawingsApproval, RailwayBlock, RiskRegister, BOQItem,
-            CalibrationRecord, ClaimsVariation, ContractCompliance,
-            DelayReason, MaterialProcurement, RFI, StakeholderIssue,
-            SubcontractorPerformance, ThirdPartyInspection, ToolboxTalk,
-            VendorPerformance, WorkPermit
-        )
+        print(f"Connected to MongoDB: {settings.database_name}")
 
-        await init_beanie(
-            database=database,
-            document_models=[
-                Project, DailyLog, DailyActivity, CostEntry, BudgetItem,
-                ProjectPackage, ProjectMilestone, RABill, QualityTest, NCR,
-                SafetyIncident, LabourManpower, PlantMachinery, MaterialInventory,
-                DrawingsApproval, RailwayBlock, RiskRegister, BOQItem,
-                CalibrationRecord, ClaimsVariation, ContractCompliance,
-                DelayReason, MaterialProcurement, RFI, StakeholderIssue,
-                SubcontractorPerformance, ThirdPartyInspection, ToolboxTalk,
-                VendorPerformance, WorkPermit
-            ]
+        # Register the hot-path models now (the remaining collections are
+        # registered on first use through ensure_models()); minPoolSize has
+        # the driver open the rest of the pool in the background
+        await asyncio.gather(
+            ensure_models(Project, DailyLog, CostEntry, BudgetItem),
+            # Seeding upserts on contract_no; projects without one are exempt
+            database.projects.create_index(
+                "contract_no",
+                unique=True,
+                partialFilterExpression={"contract_no": {"$type": "string"}},
+            ),
         )
 
     except Exception as e:
@@ -57,20 +98,19 @@ async def init_mongodb():
         print("Running with mock data fallback")
 
 
-async def seed_if_empty():
-    """Seed database with sample data if empty"""
+async def _seed_mongo():
+    """Seed MongoDB with the sample project and its data if not present"""
     if not DB_AVAILABLE:
         print("⚠️ MongoDB not available, skipping seeding")
         return
 
     try:
-        # Check if projects collection is empty
-        count = await database.projects.count_documents({})
-        if count > 0:
+        # A marker document records a completed seed, so warm starts stop here
+        if await database.meta.find_one({"_id": SEED_MARKER_ID}, projection={"_id": 1}):
             return
 
-        # Insert sample project
-        from .models import Project
+        # Insert the sample project only if its contract is not there yet;
+        # the unique index on contract_no makes this atomic across replicas
         project = Project(
             name="Railway ROB + Bridge Works (Pile Foundation & Sub-Structure)",
             client="Indian Railways / PWD",
@@ -85,45 +125,60 @@ async def seed_if_empty():
             site_engineer="Er. R. K. Gupta",
             status="active"
         )
+        result = await database.projects.update_one(
+            {"contract_no": project.contract_no},
+            {"$setOnInsert": project.model_dump(exclude={"id", "revision_id"})},
+            upsert=True,
+        )
+        if result.upserted_id is None:
+            await _mark_seeded()
+            return
 
-        await project.insert()
-        print(f"✅ Database seeded with sample project ID: {project.id}")
+        print(f"✅ Database seeded with sample project ID: {result.upserted_id}")
 
         # Seed additional sample data for all collections
-        await _seed_sample_data(project.id)
+        await _seed_sample_data(result.upserted_id)
+        await _mark_seeded()
 
     except Exception as e:
         print(f"❌ Error seeding database: {e}")
 
 
+async def _mark_seeded():
+    await database.meta.update_one(
+        {"_id": SEED_MARKER_ID},
+        {"$setOnInsert": {"at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
 async def _seed_sample_data(project_id):
     """Seed all collections with sample construction data"""
+    # Document models store project_id as a string
+    project_id = str(project_id)
     try:
+        await ensure_models(
+            ProjectPackage, ProjectMilestone, RABill, QualityTest, NCR,
+            SafetyIncident, LabourManpower, PlantMachinery, MaterialInventory
+        )
+
         # Seed project packages
-        from .models import ProjectPackage
         packages = [
             ProjectPackage(project_id=project_id, package_name="Pile Foundation Works", planned_value=2_00_00_000, actual_value=1_80_00_000, progress_percentage=90.0),
-            ProjectPackage(package_name="Bridge Sub-Structure", planned_value=3_00_00_000, actual_value=2_80_00_000, progress_percentage=93.3),
-            ProjectPackage(package_name="Bridge Super-Structure", planned_value=2_50_00_000, actual_value=2_20_00_000, progress_percentage=88.0),
-            ProjectPackage(package_name="Railway Track & Signaling", planned_value=2_50_00_000, actual_value=2_26_00_000, progress_percentage=90.4),
+            ProjectPackage(project_id=project_id, package_name="Bridge Sub-Structure", planned_value=3_00_00_000, actual_value=2_80_00_000, progress_percentage=93.3),
+            ProjectPackage(project_id=project_id, package_name="Bridge Super-Structure", planned_value=2_50_00_000, actual_value=2_20_00_000, progress_percentage=88.0),
+            ProjectPackage(project_id=project_id, package_name="Railway Track & Signaling", planned_value=2_50_00_000, actual_value=2_26_00_000, progress_percentage=90.4),
         ]
-        for pkg in packages:
-            pkg.project_id = project_id
-            await pkg.insert()
 
         # Seed milestones
-        from .models import ProjectMilestone
         milestones = [
             ProjectMilestone(project_id=project_id, milestone_name="Mobilization Complete", planned_date="2026-01-15", actual_date="2026-01-12", status="completed"),
             ProjectMilestone(project_id=project_id, milestone_name="Pile Foundation 50% Complete", planned_date="2026-03-15", actual_date="2026-03-20", status="completed"),
             ProjectMilestone(project_id=project_id, milestone_name="Bridge Deck Casting", planned_date="2026-08-15", actual_date="2026-08-30", status="in_progress"),
             ProjectMilestone(project_id=project_id, milestone_name="Final Handover", planned_date="2026-12-15", actual_date=None, status="pending"),
         ]
-        for milestone in milestones:
-            await milestone.insert()
 
         # Seed RA Bills
-        from .models import RABill
         ra_bills = [
             RABill(project_id=project_id, bill_no="RA-001", bill_date="2026-02-28", bill_amount=45_00_000, certified_amount=42_00_000, paid_amount=42_00_000, payment_date="2026-03-15", status="paid"),
             RABill(project_id=project_id, bill_no="RA-002", bill_date="2026-04-30", bill_amount=52_00_000, certified_amount=48_00_000, paid_amount=48_00_000, payment_date="2026-05-15", status="paid"),
@@ -131,213 +186,504 @@ async def _seed_sample_data(project_id):
             RABill(project_id=project_id, bill_no="RA-004", bill_date="2026-08-30", bill_amount=62_00_000, certified_amount=58_00_000, paid_amount=58_00_000, payment_date="2026-09-15", status="paid"),
             RABill(project_id=project_id, bill_no="RA-005", bill_date="2026-10-30", bill_amount=68_00_000, certified_amount=65_00_000, paid_amount=None, payment_date=None, status="certified"),
         ]
-        for bill in ra_bills:
-            await bill.insert()
 
         # Seed Quality Tests
-        from .models import QualityTest
         quality_tests = [
             QualityTest(project_id=project_id, test_type="Concrete Cube Test", planned_tests=120, conducted_tests=118, passed_tests=115, pass_rate=97.5, status="ongoing"),
             QualityTest(project_id=project_id, test_type="Rebar Testing", planned_tests=80, conducted_tests=76, passed_tests=74, pass_rate=97.4, status="ongoing"),
             QualityTest(project_id=project_id, test_type="Soil Compaction", planned_tests=60, conducted_tests=58, passed_tests=56, pass_rate=96.6, status="ongoing"),
             QualityTest(project_id=project_id, test_type="Weld Testing", planned_tests=40, conducted_tests=38, passed_tests=37, pass_rate=97.4, status="ongoing"),
         ]
-        for test in quality_tests:
-            await test.insert()
 
         # Seed NCRs
-        from .models import NCR
         ncrs = [
             NCR(project_id=project_id, ncr_no="NCR-001", description="Concrete mix design variation", raised_date="2026-03-15", category="Quality", severity="Medium", status="Closed", closure_date="2026-03-20"),
             NCR(project_id=project_id, ncr_no="NCR-002", description="Formwork alignment issue", raised_date="2026-04-10", category="Quality", severity="Low", status="Closed", closure_date="2026-04-12"),
             NCR(project_id=project_id, ncr_no="NCR-003", description="Reinforcement cover deficiency", raised_date="2026-05-05", category="Quality", severity="High", status="Open", closure_date=None),
             NCR(project_id=project_id, ncr_no="NCR-004", description="Curing procedure non-compliance", raised_date="2026-06-20", category="Quality", severity="Medium", status="Open", closure_date=None),
         ]
-        for ncr in ncrs:
-            await ncr.insert()
 
         # Seed Safety Incidents
-        from .models import SafetyIncident
         incidents = [
             SafetyIncident(project_id=project_id, incident_no="INC-001", incident_date="2026-02-15", incident_type="Near Miss", description="Worker slip on wet surface", severity="Low", status="Closed", action_taken="Safety briefing conducted"),
             SafetyIncident(project_id=project_id, incident_no="INC-002", incident_date="2026-03-22", incident_type="First Aid", description="Minor cut during rebar work", severity="Low", status="Closed", action_taken="First aid provided, safety gloves reinforced"),
             SafetyIncident(project_id=project_id, incident_no="INC-003", incident_date="2026-05-10", incident_type="Medical Treatment", description="Eye irritation from concrete dust", severity="Medium", status="Closed", action_taken="PPE training reinforced"),
             SafetyIncident(project_id=project_id, incident_no="INC-004", incident_date="2026-07-05", incident_type="Lost Time Injury", description="Ankle sprain during material handling", severity="High", status="Closed", action_taken="Medical treatment provided, lifting equipment training"),
         ]
-        for incident in incidents:
-            await incident.insert()
 
         # Seed Labour Manpower
-        from .models import LabourManpower
         labour_data = [
             LabourManpower(project_id=project_id, recorded_date="2026-10-01", planned_manpower=150, actual_manpower=145, mason_count=25, carpenter_count=15, bar_bender_count=20, welder_count=8, absenteeism_rate=3.3, overtime_hours=120),
         ]
-        for labour in labour_data:
-            await labour.insert()
 
         # Seed Plant Machinery
-        from .models import PlantMachinery
         machinery = [
             PlantMachinery(project_id=project_id, equipment_name="Batching Plant", equipment_type="Concrete Plant", availability_percentage=95.0, utilization_percentage=88.0, breakdown_hours=12, idle_time_causes="Waiting for material"),
             PlantMachinery(project_id=project_id, equipment_name="Pile Driving Rig", equipment_type="Foundation Equipment", availability_percentage=92.0, utilization_percentage=85.0, breakdown_hours=24, idle_time_causes="Weather conditions"),
             PlantMachinery(project_id=project_id, equipment_name="Concrete Pump", equipment_type="Placing Equipment", availability_percentage=98.0, utilization_percentage=90.0, breakdown_hours=8, idle_time_causes="No front"),
         ]
-        for machine in machinery:
-            await machine.insert()
 
         # Seed Material Inventory
-        from .models import MaterialInventory
         materials = [
             MaterialInventory(project_id=project_id, material_name="Cement", current_stock=150, min_stock=100, max_stock=300, unit="MT", stock_value=4_50_000, lead_time_days=3),
             MaterialInventory(project_id=project_id, material_name="Steel Reinforcement", current_stock=45, min_stock=30, max_stock=100, unit="MT", stock_value=13_50_000, lead_time_days=7),
             MaterialInventory(project_id=project_id, material_name="Coarse Aggregate", current_stock=200, min_stock=150, max_stock=400, unit="Cum", stock_value=2_00_000, lead_time_days=2),
         ]
-        for material in materials:
-            await material.insert()
 
-        print("✅ All sample data seeded successfully")
+        # Collections are independent, so write them concurrently
+        results = await asyncio.gather(
+            ProjectPackage.insert_many(packages, ordered=False),
+            ProjectMilestone.insert_many(milestones, ordered=False),
+            RABill.insert_many(ra_bills, ordered=False),
+            QualityTest.insert_many(quality_tests, ordered=False),
+            NCR.insert_many(ncrs, ordered=False),
+            SafetyIncident.insert_many(incidents, ordered=False),
+            LabourManpower.insert_many(labour_data, ordered=False),
+            PlantMachinery.insert_many(machinery, ordered=False),
+            MaterialInventory.insert_many(materials, ordered=False),
+            return_exceptions=True,
+        )
+        failures = [r for r in results if isinstance(r, Exception)]
+        for err in failures:
+            print(f"❌ Error seeding sample collection: {err}")
+        if not failures:
+            print("✅ All sample data seeded successfully")
 
     except Exception as e:
         print(f"❌ Error seeding sample data: {e}")
 
 
-def init_db():
-    """Initialize database (compatibility function)"""
-    # This is now async, so we'll handle it in the main startup
-    pass
+# ---------- SQL backend (SQLite locally, PostgreSQL via DATABASE_URL) ----------
 
+# Imported once here, and only when configured, so SQLite deployments don't
+# need the driver and a missing one fails at startup instead of per request
+if IS_POSTGRESQL:
+    import psycopg2
+    from psycopg2.pool import ThreadedConnectionPool
 
-def init_db() -> None:
-    """Initialize database schema"""
-    global IS_POSTGRESQL
+# Bind-parameter placeholder for the active driver (psycopg2 uses format style)
+PARAM = "%s" if IS_POSTGRESQL else "?"
 
-    if IS_POSTGRESQL:
-        # For PostgreSQL, we'll need different schema
-        print("PostgreSQL database - schema initialization may be needed")
+
+# Rows here are TEXT-heavy, so larger pages mean fewer B-tree splits and page
+# reads per scan. cache_size below is in KiB, so the cache holds half as many
+# 8 KiB pages as it would 4 KiB ones.
+SQLITE_PAGE_SIZE = 8192
+
+# Room for every distinct statement shape the API issues, so pooled
+# connections never evict and re-prepare a hot query (stdlib default is 128)
+SQLITE_CACHED_STATEMENTS = 256
+
+# Per-connection settings; synchronous=NORMAL is safe under WAL and avoids an
+# fsync on every commit. The page cache is per connection, so its size is
+# multiplied by the pool size plus the writer.
+_SQLITE_PRAGMAS = f"""
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-{settings.sqlite_cache_size_kib};
+PRAGMA mmap_size=268435456;
+PRAGMA busy_timeout=5000;
+PRAGMA foreign_keys=ON;
+"""
+
+# Database files already switched to WAL by this process
+_wal_paths: set[str] = set()
+
+
+_DB_PATH = Path(settings.database_path)
+_DB_PARENT_READY = False
+
+
+def _ensure_db_dir() -> None:
+    global _DB_PARENT_READY
+    if _DB_PARENT_READY:
         return
+    _DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    _DB_PARENT_READY = True
 
-    # SQLite schema initialization
-    _ensure_db_dir()
-    with db_cursor() as cur:
-        cur.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS projects (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              name TEXT NOT NULL,
-              client TEXT NOT NULL,
-              location TEXT NOT NULL,
-              contract_no TEXT,
-              start_date TEXT,
-              end_date TEXT,
-              total_contract_value REAL,
-              profit_margin_target REAL DEFAULT 10.0,
-              created_at TEXT NOT NULL DEFAULT (datetime('now'))
-            );
-
-            CREATE TABLE IF NOT EXISTS daily_logs (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              project_id INTEGER NOT NULL,
-              log_date TEXT NOT NULL,
-              weather TEXT,
-              remarks TEXT,
-              created_at TEXT NOT NULL DEFAULT (datetime('now')),
-              FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS daily_activities (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              daily_log_id INTEGER NOT NULL,
-              category TEXT NOT NULL,
-              activity TEXT NOT NULL,
-              uom TEXT NOT NULL,
-              quantity REAL NOT NULL DEFAULT 0,
-              labour_count INTEGER NOT NULL DEFAULT 0,
-              machinery TEXT,
-              notes TEXT,
-              FOREIGN KEY(daily_log_id) REFERENCES daily_logs(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS cost_entries (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              project_id INTEGER NOT NULL,
-              entry_date TEXT NOT NULL,
-              cost_head TEXT NOT NULL,
-              description TEXT NOT NULL,
-              vendor TEXT,
-              amount REAL NOT NULL,
-              quantity REAL,
-              uom TEXT,
-              unit_rate REAL,
-              payment_mode TEXT,
-              bill_no TEXT,
-              created_at TEXT NOT NULL DEFAULT (datetime('now')),
-              FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS budget_items (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              project_id INTEGER NOT NULL,
-              cost_head TEXT NOT NULL,
-              budget_amount REAL NOT NULL,
-              notes TEXT,
-              created_at TEXT NOT NULL DEFAULT (datetime('now')),
-              UNIQUE(project_id, cost_head),
-              FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
-            );
-            """
+
+def get_connection(readonly: bool = False):
+    if IS_POSTGRESQL:
+        return psycopg2.connect(settings.database_url)
+
+    path = settings.database_path
+    # isolation_level=None stops the driver issuing implicit BEGINs;
+    # db_cursor(write=True) manages the write transaction itself
+    if readonly:
+        uri = Path(path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(
+            uri, uri=True, check_same_thread=False, isolation_level=None,
+            cached_statements=SQLITE_CACHED_STATEMENTS,
+        )
+    else:
+        is_new = path == ":memory:" or not os.path.exists(path)
+        conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None,
+            cached_statements=SQLITE_CACHED_STATEMENTS,
         )
+        if is_new:
+            # page_size is fixed once the first page is written (and under WAL
+            # even VACUUM can't change it), so it only applies to new files
+            conn.execute(f"PRAGMA page_size={SQLITE_PAGE_SIZE};")
+        # journal_mode is persistent in the file, so only switch it once per path
+        if path != ":memory:" and path not in _wal_paths:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            _wal_paths.add(path)
+    conn.executescript(_SQLITE_PRAGMAS)
+    return conn
+
+
+# Under WAL any number of readers run alongside one writer. Writes go through
+# a single connection guarded by a lock, so they queue here instead of racing
+# each other for the file lock and failing with SQLITE_BUSY. Reads use a pool
+# of read-only connections, opened lazily up to the pool size and reused
+# across requests instead of reopening the file each time.
+_sqlite_writer: sqlite3.Connection | None = None
+_sqlite_writer_lock = threading.Lock()
+
+_sqlite_pool: queue.LifoQueue = queue.LifoQueue()
+_sqlite_pool_lock = threading.Lock()
+_sqlite_pool_opened = 0
+
+
+def _acquire_sqlite():
+    global _sqlite_pool_opened
+    try:
+        return _sqlite_pool.get_nowait()
+    except queue.Empty:
+        pass
+    with _sqlite_pool_lock:
+        if _sqlite_pool_opened < settings.sqlite_pool_size:
+            _sqlite_pool_opened += 1
+            try:
+                return get_connection(readonly=True)
+            except Exception:
+                _sqlite_pool_opened -= 1
+                raise
+    # Pool exhausted; wait for another request to hand one back
+    return _sqlite_pool.get()
+
+
+def _writer() -> sqlite3.Connection:
+    """Return the writer connection; call with _sqlite_writer_lock held"""
+    global _sqlite_writer
+    if _sqlite_writer is None:
+        _sqlite_writer = get_connection()
+    return _sqlite_writer
+
+
+@atexit.register
+def _close_sqlite_pool() -> None:
+    global _sqlite_writer
+    while True:
+        try:
+            _sqlite_pool.get_nowait().close()
+        except queue.Empty:
+            break
+    with _sqlite_writer_lock:
+        if _sqlite_writer is None:
+            return
+        try:
+            # Refresh planner statistics the session found stale before closing
+            _sqlite_writer.execute("PRAGMA optimize;")
+        finally:
+            _sqlite_writer.close()
+            _sqlite_writer = None
+
+
+# Long-lived pooled connections rarely close, so also optimize on a timer
+SQLITE_OPTIMIZE_INTERVAL_SECONDS = 3 * 60 * 60
+
+
+def optimize_sqlite() -> None:
+    with _sqlite_writer_lock:
+        _writer().execute("PRAGMA optimize;")
+
 
+async def optimize_sqlite_periodically() -> None:
+    while True:
+        await asyncio.sleep(SQLITE_OPTIMIZE_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(optimize_sqlite)
+        except Exception as e:
+            print(f"PRAGMA optimize failed: {e}")
+
+
+_pg_pool_instance = None
+_pg_pool_lock = threading.Lock()
+
+
+def _pg_pool():
+    """Return the process-wide psycopg2 pool, creating it on first use"""
+    global _pg_pool_instance
+    if _pg_pool_instance is None:
+        with _pg_pool_lock:
+            if _pg_pool_instance is None:
+                _pg_pool_instance = ThreadedConnectionPool(
+                    settings.pg_pool_min_size,
+                    settings.pg_pool_max_size,
+                    dsn=settings.database_url,
+                )
+    return _pg_pool_instance
+
+
+@atexit.register
+def _close_pg_pool() -> None:
+    if _pg_pool_instance is not None:
+        _pg_pool_instance.closeall()
+
+
+# Cleared while start_sql_init() runs schema setup and seeding on a background
+# thread; db_cursor waits on it so requests never see a half-built database
+_sql_ready = threading.Event()
+_sql_ready.set()
+
+
+class _DbCursor:
+    """Yield a cursor inside a transaction committed on exit.
+
+    SQLite rows are sqlite3.Row by default so handlers can look columns up by
+    name; pass row_factory=None for plain tuples where names aren't needed.
+    A plain class rather than @contextmanager, since every request enters
+    one and the generator protocol costs several times more per use.
+    """
+
+    __slots__ = ("_write", "_row_factory", "_wait", "_conn", "_cur", "_pool")
+
+    def __init__(self, write: bool = False, row_factory=sqlite3.Row, wait: bool = True):
+        self._write = write
+        self._row_factory = row_factory
+        self._wait = wait
+
+    def __enter__(self):
+        if self._wait and not _sql_ready.is_set():
+            _sql_ready.wait()
+
+        if IS_POSTGRESQL:
+            self._pool = _pg_pool()
+            self._conn = self._pool.getconn()
+            self._cur = self._conn.cursor()
+            return self._cur
+
+        if self._write:
+            _sqlite_writer_lock.acquire()
+            try:
+                self._conn = _writer()
+                self._cur = self._conn.cursor()
+                self._cur.row_factory = self._row_factory
+                # Take the write lock up front rather than upgrading a
+                # deferred transaction on the first write
+                self._cur.execute("BEGIN IMMEDIATE;")
+            except BaseException:
+                _sqlite_writer_lock.release()
+                raise
+            return self._cur
+
+        # Readers run in autocommit; each statement gets its own read snapshot
+        self._conn = _acquire_sqlite()
+        self._cur = self._conn.cursor()
+        self._cur.row_factory = self._row_factory
+        return self._cur
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        conn, cur = self._conn, self._cur
+        self._conn = self._cur = None
 
-def seed_if_empty() -> None:
-    """Seed database with sample data if empty"""
-    with db_cursor() as cur:
         if IS_POSTGRESQL:
-            cur.execute("SELECT COUNT(*) AS c FROM projects;")
-            count = int(cur.fetchone()[0])
-        else:
-            cur.execute("SELECT COUNT(*) AS c FROM projects;")
-            count = int(cur.fetchone()["c"])
+            try:
+                if exc_type is None:
+                    conn.commit()
+                else:
+                    # An aborted transaction would fail every later statement
+                    # on this connection until rolled back
+                    conn.rollback()
+            finally:
+                self._pool.putconn(conn)
+            return False
+
+        if self._write:
+            try:
+                # COMMIT goes through the same cursor so a RETURNING statement
+                # the caller didn't drain is reset first
+                if exc_type is None:
+                    try:
+                        cur.execute("COMMIT;")
+                    except BaseException:
+                        cur.execute("ROLLBACK;")
+                        raise
+                else:
+                    cur.execute("ROLLBACK;")
+            finally:
+                _sqlite_writer_lock.release()
+            return False
+
+        # Don't hand a connection with an open transaction to the next caller
+        if conn.in_transaction:
+            conn.rollback()
+        _sqlite_pool.put(conn)
+        return False
+
+
+db_cursor = _DbCursor
+
+
+# Bound-parameter limit per statement (SQLite >= 3.32; PostgreSQL allows more)
+_MAX_BULK_PARAMS = 32766
+
+
+def bulk_insert(cur, table: str, cols: tuple[str, ...], rows: list[tuple]) -> list:
+    """Insert rows with multi-row INSERT ... RETURNING * and return them.
+
+    Call inside one db_cursor(write=True) block so the whole batch is a single
+    transaction; rows are only split to stay under the parameter limit.
+    """
+    inserted: list = []
+    per_statement = max(1, _MAX_BULK_PARAMS // len(cols))
+    row_sql = "(" + ", ".join([PARAM] * len(cols)) + ")"
+    for start in range(0, len(rows), per_statement):
+        chunk = rows[start:start + per_statement]
+        cur.execute(
+            f"INSERT INTO {table} ({', '.join(cols)}) VALUES {', '.join([row_sql] * len(chunk))} RETURNING *",
+            [value for row in chunk for value in row],
+        )
+        inserted.extend(cur.fetchall())
+    return inserted
+
+
+# Stored in PRAGMA user_version once schema.sql is applied; bump it
+# whenever the schema changes so existing files pick up the new statements
+SQLITE_SCHEMA_VERSION = 5
+
+# Set once this process has confirmed the schema is current
+_SCHEMA_READY = False
+
+# The create handlers and the seed insert read their rows back with RETURNING
+_SQLITE_MIN_VERSION = (3, 35, 0)
+
+_SQLITE_SCHEMA_PATH = Path(__file__).with_name("schema.sql")
+
+# Columns added to tables that already existed in older files. CREATE TABLE
+# IF NOT EXISTS leaves those tables alone, so they get an ALTER instead
+_SQLITE_ADDED_COLUMNS = (
+    ("projects", "status", "TEXT NOT NULL DEFAULT 'Planning'"),
+)
+
 
-        if count > 0:
+def _sqlite_schema_statements() -> list[str]:
+    """Read schema.sql; only needed when user_version is behind"""
+    schema = _SQLITE_SCHEMA_PATH.read_text(encoding="utf-8")
+    return [stmt.strip() for stmt in schema.split(";") if stmt.strip()]
+
+
+def _init_pg() -> None:
+    """Initialize PostgreSQL database"""
+    global DB_AVAILABLE
+    # For PostgreSQL, we'll need different schema
+    print("PostgreSQL database - schema initialization may be needed")
+    DB_AVAILABLE = True
+
+
+def _sqlite_user_version() -> int:
+    with _sqlite_writer_lock:
+        return _writer().execute("PRAGMA user_version;").fetchone()[0]
+
+
+def _init_sqlite() -> None:
+    """Initialize SQLite database schema"""
+    global DB_AVAILABLE, _SCHEMA_READY
+    if _SCHEMA_READY:
+        DB_AVAILABLE = True
+        return
+    if sqlite3.sqlite_version_info < _SQLITE_MIN_VERSION:
+        raise RuntimeError(
+            f"SQLite {sqlite3.sqlite_version} is too old, "
+            f"{'.'.join(map(str, _SQLITE_MIN_VERSION))}+ is required for RETURNING"
+        )
+    _ensure_db_dir()
+    # Warm files answer with a single PRAGMA read, without taking the write lock
+    if _sqlite_user_version() < SQLITE_SCHEMA_VERSION:
+        # One transaction for the whole schema instead of executescript's
+        # per-statement autocommit; re-checked under the lock in case another
+        # process applied it meanwhile
+        with _DbCursor(write=True, row_factory=None, wait=False) as cur:
+            cur.execute("PRAGMA user_version;")
+            if cur.fetchone()[0] < SQLITE_SCHEMA_VERSION:
+                for stmt in _sqlite_schema_statements():
+                    cur.execute(stmt)
+                for table, column, decl in _SQLITE_ADDED_COLUMNS:
+                    cur.execute(f"PRAGMA table_info({table});")
+                    if all(row[1] != column for row in cur.fetchall()):
+                        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl};")
+                cur.execute(f"PRAGMA user_version={SQLITE_SCHEMA_VERSION};")
+    optimize_sqlite()
+    _SCHEMA_READY = True
+    DB_AVAILABLE = True
+
+
+_SAMPLE_PROJECT = (
+    "Railway ROB + Bridge Works (Pile Foundation & Sub-Structure)",
+    "Indian Railways / PWD",
+    "Maharashtra",
+    "PWD-IR-ROB-001",
+    "2026-01-01",
+    "2026-12-31",
+    10_00_00_000,  # 10 crores total contract value
+    12.0,  # 12% profit margin target
+    "Execution",
+)
+
+_INSERT_PROJECT_SQL = (
+    "INSERT INTO projects (name, client, location, contract_no, start_date, end_date, "
+    "total_contract_value, profit_margin_target, status) VALUES ({}) RETURNING id"
+).format(", ".join([PARAM] * len(_SAMPLE_PROJECT)))
+
+
+def _seed_sql() -> None:
+    """Seed SQL database with sample data if empty"""
+    # On SQLite the write cursor holds the write lock before counting, so two
+    # processes starting together can't both see an empty table and seed it
+    with _DbCursor(write=True, row_factory=None, wait=False) as cur:
+        # Stops at the first row instead of counting the whole table
+        cur.execute("SELECT 1 FROM projects LIMIT 1;")
+        if cur.fetchone() is not None:
             return
 
         # Insert sample project
-        if IS_POSTGRESQL:
-            cur.execute(
-                """
-                INSERT INTO projects (name, client, location, contract_no, start_date, end_date, total_contract_value, profit_margin_target)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-                """,
-                (
-                    "Railway ROB + Bridge Works (Pile Foundation & Sub-Structure)",
-                    "Indian Railways / PWD",
-                    "Maharashtra",
-                    "PWD-IR-ROB-001",
-                    "2026-01-01",
-                    "2026-12-31",
-                    10_00_00_000,  # 10 crores total contract value
-                    12.0,  # 12% profit margin target
-                ),
-            )
-            project_id = cur.fetchone()[0]
-        else:
-            cur.execute(
-                """
-                INSERT INTO projects (name, client, location, contract_no, start_date, end_date, total_contract_value, profit_margin_target)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    "Railway ROB + Bridge Works (Pile Foundation & Sub-Structure)",
-                    "Indian Railways / PWD",
-                    "Maharashtra",
-                    "PWD-IR-ROB-001",
-                    "2026-01-01",
-                    "2026-12-31",
-                    10_00_00_000,  # 10 crores total contract value
-                    12.0,  # 12% profit margin target
-                ),
-            )
-            project_id = cur.lastrowid
-
-        print(f"Database seeded with sample project ID: {project_id}")
\ No newline at end of file
+        cur.execute(_INSERT_PROJECT_SQL, _SAMPLE_PROJECT)
+        project_id = cur.fetchone()[0]
+
+        print(f"Database seeded with sample project ID: {project_id}")
+
+
+# ---------- Backend dispatch ----------
+
+# BACKEND is resolved at the top of the module
+_INIT = {"pg": _init_pg, "sqlite": _init_sqlite, "mongo": init_mongodb}
+_SEED = {"pg": _seed_sql, "sqlite": _seed_sql, "mongo": _seed_mongo}
+
+init_db = _INIT[BACKEND]
+seed_if_empty = _SEED[BACKEND]
+
+
+def _init_and_seed_sql(on_done) -> None:
+    global DB_AVAILABLE
+    try:
+        init_db()
+        seed_if_empty()
+    except Exception as e:
+        print(f"Database initialization failed: {e}")
+        DB_AVAILABLE = False
+    finally:
+        _sql_ready.set()
+        if on_done is not None:
+            on_done()
+
+
+def start_sql_init(on_done=None) -> None:
+    """Initialize and seed a SQL backend on a background thread.
+
+    db_cursor blocks until this finishes; on_done runs afterwards on the
+    background thread.
+    """
+    _sql_ready.clear()
+    threading.Thread(target=_init_and_seed_sql, args=(on_done,), name="sql-init", daemon=True).start()
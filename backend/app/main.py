@@ -1,23 +1,31 @@
 from __future__ import annotations
 
 import asyncio
-from collections import defaultdict
+import hashlib
+import inspect
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache, wraps
+from itertools import chain
+from operator import attrgetter
 from typing import Any
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic_core import to_json
+
+from . import cache, db
+from .db import init_db, seed_if_empty, DB_AVAILABLE, bulk_insert, db_cursor
+from .settings import settings
+
+# The Mongo stack (bson, Beanie and the document classes) is only loaded when
+# it's the configured backend; see the matching import in db.py
+if db.BACKEND == "mongo":
+    from bson import ObjectId
+
+    from . import models
 
-from .db import init_mongodb, seed_if_empty, DB_AVAILABLE
-from .models import (
-    Project, DailyLog, DailyActivity, CostEntry, BudgetItem,
-    ProjectPackage, ProjectMilestone, RABill, QualityTest, NCR,
-    SafetyIncident, LabourManpower, PlantMachinery, MaterialInventory,
-    DrawingsApproval, RailwayBlock, RiskRegister, BOQItem,
-    CalibrationRecord, ClaimsVariation, ContractCompliance,
-    DelayReason, MaterialProcurement, RFI, StakeholderIssue,
-    SubcontractorPerformance, ThirdPartyInspection, ToolboxTalk,
-    VendorPerformance, WorkPermit
-)
 import os
 
 # Mock data for fallback when database is not available
@@ -65,17 +73,34 @@ MOCK_COST_ENTRIES = [
     }
 ]
 
-# Initialize database at import time (for local/dev). On Vercel, the
-# filesystem is read-only for bundled files, so initialization may fail;
-# we catch and fall back to mock data.
+# Initialize the database once, from the startup hook (api/index.py runs that
+# hook on the first request on Vercel). On Vercel the filesystem is read-only
+# for bundled files, so initialization may fail; we catch and fall back to
+# mock data.
 async def init_database():
     global DB_AVAILABLE
+    if db.BACKEND != "mongo":
+        # DDL and seeding run off the startup path; db_cursor waits for them,
+        # and a failure flips DB_AVAILABLE back to the mock fallback
+        DB_AVAILABLE = True
+        db.start_sql_init(on_done=_sql_init_done)
+        return
     try:
-        await init_mongodb()
-        await seed_if_empty()
+        for step in (init_db, seed_if_empty):
+            result = step()
+            if inspect.isawaitable(result):
+                await result
+        DB_AVAILABLE = db.DB_AVAILABLE
     except Exception as e:
         print(f"Database initialization failed: {e}")
         DB_AVAILABLE = False
+
+
+def _sql_init_done() -> None:
+    global DB_AVAILABLE
+    DB_AVAILABLE = db.DB_AVAILABLE
+
+
 from .schemas import (
     AiChatRequest,
     AiChatResponse,
@@ -145,10 +170,85 @@ from .schemas import (
     WorkPermit,
     WorkPermitCreate
 )
-from .services.ai import answer as ai_answer
+from .services.ai import (
+    aclose as ai_close,
+    answer as ai_answer,
+    answer_stream as ai_answer_stream,
+)
+from .utils import fetch_dicts, row_to_dict, rows_to_dicts
+
+# Mock responses are built once rather than on every request
+_MOCK_PROJECT_MODELS = [Project(**project) for project in MOCK_PROJECTS]
+
+_MOCK_JOB_COSTING = JobCostingSummary(
+    project_id=1,
+    project_name="Railway ROB + Bridge Works (Pile Foundation & Sub-Structure)",
+    client="Indian Railways / PWD",
+    location="Maharashtra",
+    total_planned_cost=8350000,
+    total_actual_cost=8642040,
+    percent_over_under_budget=3.87,
+    categories=[
+        JobCostingCategory(
+            category="Labour",
+            planned_cost=3250000,
+            actual_cost=3779500,
+            quantity=3250,
+            uom="Hours",
+            unit_cost=1161.54,
+            percent_of_total_actual=43.73,
+            percent_over_under_budget=16.15
+        ),
+        JobCostingCategory(
+            category="Materials",
+            planned_cost=3200000,
+            actual_cost=3315000,
+            quantity=81.5,
+            uom="MT/CuM",
+            unit_cost=None,
+            percent_of_total_actual=38.37,
+            percent_over_under_budget=3.59
+        ),
+        JobCostingCategory(
+            category="Equipment",
+            planned_cost=1500000,
+            actual_cost=0,
+            quantity=None,
+            uom=None,
+            unit_cost=None,
+            percent_of_total_actual=0,
+            percent_over_under_budget=-100
+        ),
+        JobCostingCategory(
+            category="Subcontractors",
+            planned_cost=400000,
+            actual_cost=1547540,
+            quantity=None,
+            uom=None,
+            unit_cost=None,
+            percent_of_total_actual=17.91,
+            percent_over_under_budget=286.89
+        )
+    ],
+)
+
 
+class _JSONResponse(JSONResponse):
+    """JSONResponse that encodes with pydantic-core instead of json.dumps.
 
-app = FastAPI(title="C S Construction Dashboard API", version="0.1.0")
+    Covers the routes not wrapped in _json_endpoint (creates, AI chat),
+    whose bodies FastAPI has already turned into plain dicts and lists.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+app = FastAPI(
+    title="C S Construction Dashboard API",
+    version="0.1.0",
+    default_response_class=_JSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -159,6 +259,72 @@ app.add_middleware(
 )
 
 
+if settings.http_cache_max_age > 0:
+    _CACHE_CONTROL = (
+        f"private, max-age={settings.http_cache_max_age}, "
+        f"stale-while-revalidate={2 * settings.http_cache_max_age}"
+    )
+else:
+    _CACHE_CONTROL = "private, no-cache"
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header names etag (weak comparison)"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _json_response(content: Any, request: Request) -> Response:
+    """Encode content and tag it, so unchanged dashboard polls get an empty 304"""
+    body = to_json(content)
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _json_endpoint(fn):
+    """Serialize a handler's models straight to JSON bytes, with an ETag.
+
+    FastAPI passes a returned Response through untouched. Otherwise it dumps
+    the handler's models to dicts, re-validates them against response_model
+    and encodes them with the json module. The route's response_model still
+    documents the shape in OpenAPI.
+
+    The wrapper also asks FastAPI for the Request (an extra keyword-only
+    parameter in its signature) to answer If-None-Match from the bytes it
+    already has, rather than buffering every response in a middleware.
+    """
+    sig = inspect.signature(fn)
+    request_param = inspect.Parameter("_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+    wrapper_sig = sig.replace(parameters=[*sig.parameters.values(), request_param])
+
+    if asyncio.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def async_wrapper(*args, _request: Request, **kwargs):
+            return _json_response(await fn(*args, **kwargs), _request)
+
+        async_wrapper.__signature__ = wrapper_sig
+        return async_wrapper
+
+    @wraps(fn)
+    def wrapper(*args, _request: Request, **kwargs):
+        return _json_response(fn(*args, **kwargs), _request)
+
+    wrapper.__signature__ = wrapper_sig
+    return wrapper
+
+
+# Strong references so the event loop doesn't garbage-collect running tasks
+_background_tasks: set[asyncio.Task] = set()
+
+
 @app.on_event("startup")
 async def _startup() -> None:
     """Run MongoDB initialization"""
@@ -174,37 +340,126 @@ async def _startup() -> None:
         print(f"Database startup initialization failed: {e}")
         DB_AVAILABLE = False
 
+    if db.BACKEND == "sqlite":
+        _background_tasks.add(asyncio.create_task(db.optimize_sqlite_periodically()))
+
+
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    await ai_close()
+
 
 @app.get("/health")
 def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+# ---------- Date-range filters ----------
+def _date_range_variants(template: str, column: str) -> dict[tuple[bool, bool], str]:
+    """Build template's {where} clause for every from/to combination up front.
+
+    Keyed by (has_from, has_to). SQLite caches prepared statements by their
+    exact text, so each filtered query only ever has these four spellings.
+    """
+    variants = {}
+    for has_from in (False, True):
+        for has_to in (False, True):
+            where = ["project_id = ?"]
+            if has_from:
+                where.append(f"{column} >= ?")
+            if has_to:
+                where.append(f"{column} <= ?")
+            variants[has_from, has_to] = template.replace("{where}", " AND ".join(where))
+    return variants
+
+
+def _date_range_params(project_id: int, from_date: str | None, to_date: str | None) -> tuple[Any, ...]:
+    params: tuple[Any, ...] = (project_id,)
+    if from_date:
+        params += (from_date,)
+    if to_date:
+        params += (to_date,)
+    return params
+
+
+def _columns(model: type) -> str:
+    """SELECT list for a response model's fields, in declaration order.
+
+    List endpoints return the fetched dicts as they are: with exactly the
+    model's keys in the model's order they encode to the same JSON as the
+    models would, without building one per row.
+    """
+    return ", ".join(model.model_fields)
+
+
+_LIST_DAILY_LOGS_SQL = _date_range_variants(
+    f"SELECT {_columns(DailyLog)} FROM daily_logs WHERE {{where}} ORDER BY log_date DESC, id DESC;", "log_date"
+)
+_LIST_COSTS_SQL = _date_range_variants(
+    f"SELECT {_columns(CostEntry)} FROM cost_entries WHERE {{where}} ORDER BY entry_date DESC, id DESC;", "entry_date"
+)
+_LIST_PROJECTS_SQL = f"SELECT {_columns(Project)} FROM projects ORDER BY id DESC;"
+_LIST_DAILY_ACTIVITIES_SQL = (
+    f"SELECT {_columns(DailyActivity)} FROM daily_activities WHERE daily_log_id = ? ORDER BY id DESC;"
+)
+_LIST_BUDGETS_SQL = f"SELECT {_columns(BudgetItem)} FROM budget_items WHERE project_id = ? ORDER BY cost_head;"
+_RECENT_LOGS_SQL = _date_range_variants(
+    """
+    SELECT * FROM daily_logs
+    WHERE {where}
+    ORDER BY log_date DESC, id DESC
+    LIMIT 10
+    """,
+    "log_date",
+)
+# Cost and budget per head side by side, for summary's variance. amt or
+# budget is NULL when the head only appears on the other side
+_COST_VS_BUDGET_BY_HEAD_SQL = _date_range_variants(
+    """
+    SELECT cost_head, SUM(amt) AS amt, SUM(budget) AS budget
+    FROM (
+        SELECT cost_head, amount AS amt, NULL AS budget
+        FROM cost_entries
+        WHERE {where}
+        UNION ALL
+        SELECT cost_head, NULL, budget_amount
+        FROM budget_items
+        WHERE project_id = ?
+    )
+    GROUP BY cost_head
+    ORDER BY cost_head
+    """,
+    "entry_date",
+)
+
+
 # ---------- Projects ----------
+# The mock fallback is answered ahead of the cache, so its results never
+# occupy entries that the database path would later be served from
 @app.get("/projects", response_model=list[Project])
-def list_projects() -> list[Project]:
+@_json_endpoint
+def list_projects() -> list[Project] | list[dict[str, Any]]:
     if not DB_AVAILABLE:
-        # Return mock data when database is not available
-        return [Project(**project) for project in MOCK_PROJECTS]
+        return _MOCK_PROJECT_MODELS
+    return _list_projects()
 
-    try:
-        with db_cursor() as cur:
-            cur.execute("SELECT * FROM projects ORDER BY id DESC;")
-            rows = cur.fetchall()
-        return [Project(**row_to_dict(r)) for r in rows]
-    except Exception as e:
-        print(f"Database query failed: {e}")
-        # Fallback to mock data
-        return [Project(**project) for project in MOCK_PROJECTS]
+
+@cache.cached
+def _list_projects() -> list[dict[str, Any]]:
+    # Rows come from our own schema, so skip per-row validation here.
+    with db_cursor(row_factory=None) as cur:
+        cur.execute(_LIST_PROJECTS_SQL)
+        return fetch_dicts(cur)
 
 
 @app.post("/projects", response_model=Project)
 def create_project(payload: ProjectCreate) -> Project:
-    with db_cursor() as cur:
+    with db_cursor(write=True) as cur:
         cur.execute(
             """
-            INSERT INTO projects (name, client, location, contract_no, start_date, end_date, total_contract_value, profit_margin_target)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO projects (name, client, location, contract_no, start_date, end_date, total_contract_value, profit_margin_target, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING *
             """,
             (
                 payload.name,
@@ -215,74 +470,70 @@ def create_project(payload: ProjectCreate) -> Project:
                 payload.end_date,
                 payload.total_contract_value,
                 payload.profit_margin_target,
+                payload.status,
             ),
         )
-        project_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM projects WHERE id = ?;", (project_id,))
         row = cur.fetchone()
-    return Project(**row_to_dict(row))
+    # The project-independent entries: /projects and /portfolio-overview
+    cache.invalidate()
+    return Project.model_construct(**row_to_dict(row))
 
 
 @app.delete("/projects/{project_id}")
 def delete_project(project_id: int) -> dict[str, Any]:
-    with db_cursor() as cur:
+    with db_cursor(write=True) as cur:
         cur.execute("DELETE FROM projects WHERE id = ?;", (project_id,))
         if cur.rowcount == 0:
             raise HTTPException(status_code=404, detail="Project not found")
+    cache.invalidate(project_id)
+    # The project-independent entries: /projects and /portfolio-overview
+    cache.invalidate()
     return {"deleted": True, "project_id": project_id}
 
 
 # ---------- Daily Logs ----------
 @app.get("/projects/{project_id}/daily-logs", response_model=list[DailyLog])
-def list_daily_logs(project_id: int, from_date: str | None = None, to_date: str | None = None) -> list[DailyLog]:
-    where = ["project_id = ?"]
-    params: list[Any] = [project_id]
-    if from_date:
-        where.append("log_date >= ?")
-        params.append(from_date)
-    if to_date:
-        where.append("log_date <= ?")
-        params.append(to_date)
-
-    sql = f"SELECT * FROM daily_logs WHERE {' AND '.join(where)} ORDER BY log_date DESC, id DESC;"
-    with db_cursor() as cur:
-        cur.execute(sql, params)
-        rows = cur.fetchall()
-    return [DailyLog(**row_to_dict(r)) for r in rows]
+@_json_endpoint
+def list_daily_logs(project_id: int, from_date: str | None = None, to_date: str | None = None) -> list[dict[str, Any]]:
+    sql = _LIST_DAILY_LOGS_SQL[bool(from_date), bool(to_date)]
+    with db_cursor(row_factory=None) as cur:
+        cur.execute(sql, _date_range_params(project_id, from_date, to_date))
+        return fetch_dicts(cur)
 
 
 @app.post("/daily-logs", response_model=DailyLog)
 def create_daily_log(payload: DailyLogCreate) -> DailyLog:
-    with db_cursor() as cur:
+    with db_cursor(write=True) as cur:
         cur.execute(
             """
             INSERT INTO daily_logs (project_id, log_date, weather, remarks)
             VALUES (?, ?, ?, ?)
+            RETURNING *
             """,
             (payload.project_id, payload.log_date, payload.weather, payload.remarks),
         )
-        log_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM daily_logs WHERE id = ?;", (log_id,))
         row = cur.fetchone()
-    return DailyLog(**row_to_dict(row))
+    cache.invalidate(payload.project_id)
+    return DailyLog.model_construct(**row_to_dict(row))
 
 
 @app.get("/daily-logs/{daily_log_id}/activities", response_model=list[DailyActivity])
-def list_daily_activities(daily_log_id: int) -> list[DailyActivity]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM daily_activities WHERE daily_log_id = ? ORDER BY id DESC;", (daily_log_id,))
-        rows = cur.fetchall()
-    return [DailyActivity(**row_to_dict(r)) for r in rows]
+@_json_endpoint
+def list_daily_activities(daily_log_id: int) -> list[dict[str, Any]]:
+    with db_cursor(row_factory=None) as cur:
+        cur.execute(_LIST_DAILY_ACTIVITIES_SQL, (daily_log_id,))
+        return fetch_dicts(cur)
 
 
 @app.post("/daily-activities", response_model=DailyActivity)
 def create_daily_activity(payload: DailyActivityCreate) -> DailyActivity:
-    with db_cursor() as cur:
+    with db_cursor(write=True) as cur:
         cur.execute(
             """
             INSERT INTO daily_activities
             (daily_log_id, category, activity, uom, quantity, labour_count, machinery, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING *
             """,
             (
                 payload.daily_log_id,
@@ -295,39 +546,43 @@ def create_daily_activity(payload: DailyActivityCreate) -> DailyActivity:
                 payload.notes,
             ),
         )
-        act_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM daily_activities WHERE id = ?;", (act_id,))
         row = cur.fetchone()
-    return DailyActivity(**row_to_dict(row))
+    return DailyActivity.model_construct(**row_to_dict(row))
+
+
+_DAILY_ACTIVITY_COLS = tuple(DailyActivityCreate.model_fields)
+_daily_activity_values = attrgetter(*_DAILY_ACTIVITY_COLS)
+
+
+@app.post("/daily-activities/bulk", response_model=list[DailyActivity])
+def create_daily_activity_bulk(payloads: list[DailyActivityCreate]) -> list[DailyActivity]:
+    # A whole activity sheet commits once instead of once per row
+    if not payloads:
+        return []
+    with db_cursor(write=True) as cur:
+        rows = bulk_insert(cur, "daily_activities", _DAILY_ACTIVITY_COLS, [_daily_activity_values(p) for p in payloads])
+    return [DailyActivity.model_construct(**d) for d in rows_to_dicts(rows)]
 
 
 # ---------- Costs ----------
 @app.get("/projects/{project_id}/costs", response_model=list[CostEntry])
-def list_costs(project_id: int, from_date: str | None = None, to_date: str | None = None) -> list[CostEntry]:
-    where = ["project_id = ?"]
-    params: list[Any] = [project_id]
-    if from_date:
-        where.append("entry_date >= ?")
-        params.append(from_date)
-    if to_date:
-        where.append("entry_date <= ?")
-        params.append(to_date)
-
-    sql = f"SELECT * FROM cost_entries WHERE {' AND '.join(where)} ORDER BY entry_date DESC, id DESC;"
-    with db_cursor() as cur:
-        cur.execute(sql, params)
-        rows = cur.fetchall()
-    return [CostEntry(**row_to_dict(r)) for r in rows]
+@_json_endpoint
+def list_costs(project_id: int, from_date: str | None = None, to_date: str | None = None) -> list[dict[str, Any]]:
+    sql = _LIST_COSTS_SQL[bool(from_date), bool(to_date)]
+    with db_cursor(row_factory=None) as cur:
+        cur.execute(sql, _date_range_params(project_id, from_date, to_date))
+        return fetch_dicts(cur)
 
 
 @app.post("/costs", response_model=CostEntry)
 def create_cost(payload: CostEntryCreate) -> CostEntry:
-    with db_cursor() as cur:
+    with db_cursor(write=True) as cur:
         cur.execute(
             """
             INSERT INTO cost_entries
             (project_id, entry_date, cost_head, description, vendor, amount, quantity, uom, unit_rate, payment_mode, bill_no)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING *
             """,
             (
                 payload.project_id,
@@ -343,70 +598,79 @@ def create_cost(payload: CostEntryCreate) -> CostEntry:
                 payload.bill_no,
             ),
         )
-        cost_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM cost_entries WHERE id = ?;", (cost_id,))
         row = cur.fetchone()
-    return CostEntry(**row_to_dict(row))
+    cache.invalidate(payload.project_id)
+    return CostEntry.model_construct(**row_to_dict(row))
+
+
+_COST_COLS = tuple(CostEntryCreate.model_fields)
+_cost_values = attrgetter(*_COST_COLS)
+
+
+@app.post("/costs/bulk", response_model=list[CostEntry])
+def create_cost_bulk(payloads: list[CostEntryCreate]) -> list[CostEntry]:
+    # Imported cost sheets commit once instead of once per entry
+    if not payloads:
+        return []
+    with db_cursor(write=True) as cur:
+        rows = bulk_insert(cur, "cost_entries", _COST_COLS, [_cost_values(p) for p in payloads])
+    for project_id in {p.project_id for p in payloads}:
+        cache.invalidate(project_id)
+    return [CostEntry.model_construct(**d) for d in rows_to_dicts(rows)]
 
 
 # ---------- Budgets ----------
 @app.get("/projects/{project_id}/budgets", response_model=list[BudgetItem])
-def list_budgets(project_id: int) -> list[BudgetItem]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM budget_items WHERE project_id = ? ORDER BY cost_head;", (project_id,))
-        rows = cur.fetchall()
-    return [BudgetItem(**row_to_dict(r)) for r in rows]
+@_json_endpoint
+@cache.cached
+def list_budgets(project_id: int) -> list[dict[str, Any]]:
+    with db_cursor(row_factory=None) as cur:
+        cur.execute(_LIST_BUDGETS_SQL, (project_id,))
+        return fetch_dicts(cur)
 
 
 @app.post("/budgets/upsert", response_model=BudgetItem)
 def upsert_budget(payload: BudgetItemUpsert) -> BudgetItem:
-    with db_cursor() as cur:
+    with db_cursor(write=True) as cur:
         cur.execute(
             """
             INSERT INTO budget_items (project_id, cost_head, budget_amount, notes)
             VALUES (?, ?, ?, ?)
             ON CONFLICT(project_id, cost_head)
             DO UPDATE SET budget_amount=excluded.budget_amount, notes=excluded.notes
+            RETURNING *
             """,
             (payload.project_id, payload.cost_head, payload.budget_amount, payload.notes),
         )
-        cur.execute(
-            "SELECT * FROM budget_items WHERE project_id = ? AND cost_head = ?;",
-            (payload.project_id, payload.cost_head),
-        )
         row = cur.fetchone()
-    return BudgetItem(**row_to_dict(row))
+    cache.invalidate(payload.project_id)
+    return BudgetItem.model_construct(**row_to_dict(row))
 
 
 # ---------- Dashboard summary ----------
+# A project's end_date string is the same on every poll, so parse it once
+@lru_cache(maxsize=256)
+def _parse_iso_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
 @app.get("/projects/{project_id}/summary", response_model=DashboardSummary)
+@_json_endpoint
+@cache.cached
 def summary(project_id: int, from_date: str | None = None, to_date: str | None = None) -> DashboardSummary:
-    # Costs
-    where_cost = ["project_id = ?"]
-    params_cost: list[Any] = [project_id]
-    if from_date:
-        where_cost.append("entry_date >= ?")
-        params_cost.append(from_date)
-    if to_date:
-        where_cost.append("entry_date <= ?")
-        params_cost.append(to_date)
+    # Cost and log queries take the same (project_id, from, to) parameters
+    variant = (bool(from_date), bool(to_date))
+    params = _date_range_params(project_id, from_date, to_date)
 
-    cost_by_head: dict[str, float] = defaultdict(float)
+    cost_by_head: dict[str, float] = {}
     total_cost = 0.0
 
     # Budgets (full)
     budget_by_head: dict[str, float] = {}
     total_budget = 0.0
 
-    # Recent logs
-    where_logs = ["project_id = ?"]
-    params_logs: list[Any] = [project_id]
-    if from_date:
-        where_logs.append("log_date >= ?")
-        params_logs.append(from_date)
-    if to_date:
-        where_logs.append("log_date <= ?")
-        params_logs.append(to_date)
+    # Ordered by cost head
+    variance_by_head: dict[str, float] = {}
 
     with db_cursor() as cur:
         # Get project details
@@ -416,50 +680,23 @@ def summary(project_id: int, from_date: str | None = None, to_date: str | None =
             raise HTTPException(status_code=404, detail="Project not found")
         proj = row_to_dict(proj_row)
 
-        cur.execute(
-            f"""
-            SELECT cost_head, SUM(amount) AS amt
-            FROM cost_entries
-            WHERE {' AND '.join(where_cost)}
-            GROUP BY cost_head
-            """,
-            params_cost,
-        )
-        for r in cur.fetchall():
+        cur.execute(_COST_VS_BUDGET_BY_HEAD_SQL[variant], params + (project_id,))
+        for r in cur:
             head = str(r["cost_head"])
             amt = float(r["amt"] or 0)
-            cost_by_head[head] += amt
-            total_cost += amt
+            budget = float(r["budget"] or 0)
+            if r["amt"] is not None:
+                cost_by_head[head] = amt
+                total_cost += amt
+            if r["budget"] is not None:
+                budget_by_head[head] = budget
+                total_budget += budget
+            variance_by_head[head] = amt - budget
 
-        cur.execute(
-            """
-            SELECT cost_head, budget_amount
-            FROM budget_items
-            WHERE project_id = ?
-            """,
-            (project_id,),
-        )
-        for r in cur.fetchall():
-            head = str(r["cost_head"])
-            amt = float(r["budget_amount"] or 0)
-            budget_by_head[head] = amt
-            total_budget += amt
+        actual_by_cat, planned_by_cat = _sql_category_rollup(cur, project_id, variant, params)
 
-        cur.execute(
-            f"""
-            SELECT * FROM daily_logs
-            WHERE {' AND '.join(where_logs)}
-            ORDER BY log_date DESC, id DESC
-            LIMIT 10
-            """,
-            params_logs,
-        )
-        recent_logs = [DailyLog(**row_to_dict(r)) for r in cur.fetchall()]
-
-    variance_by_head: dict[str, float] = {}
-    all_heads = set(budget_by_head.keys()) | set(cost_by_head.keys())
-    for head in sorted(all_heads):
-        variance_by_head[head] = float(cost_by_head.get(head, 0.0) - budget_by_head.get(head, 0.0))
+        cur.execute(_RECENT_LOGS_SQL[variant], params)
+        recent_logs = [DailyLog.model_construct(**d) for d in rows_to_dicts(cur.fetchall())]
 
     # Calculate percentage over/under budget
     percent_over_under_budget = None
@@ -476,84 +713,123 @@ def summary(project_id: int, from_date: str | None = None, to_date: str | None =
     days_remaining = None
     end_date = proj.get("end_date")
     if end_date:
-        from datetime import datetime
-        end_dt = datetime.fromisoformat(end_date)
+        end_dt = _parse_iso_datetime(end_date)
         today = datetime.now()
         if end_dt > today:
             days_remaining = (end_dt - today).days
 
-    # Get job costing categories (simplified version)
-    job_costing_categories = []
-    # We'll use the same logic as the job costing endpoint but simplified
+    cats = _sql_job_costing_categories(actual_by_cat, planned_by_cat, float(total_cost))
 
-    with db_cursor() as cur:
-        cur.execute(
-            f"""
-            SELECT cost_head,
-                   SUM(amount) AS amt,
-                   SUM(COALESCE(quantity, 0)) AS qty,
-                   GROUP_CONCAT(DISTINCT COALESCE(uom, '')) AS uoms
-            FROM cost_entries
-            WHERE {' AND '.join(where_cost)}
-            GROUP BY cost_head
-            """,
-            params_cost,
-        )
-        costs = rows_to_dict(cur.fetchall())
+    return DashboardSummary.model_construct(
+        project_id=project_id,
+        from_date=from_date,
+        to_date=to_date,
+        total_cost=float(total_cost),
+        cost_by_head=cost_by_head,
+        total_budget=float(total_budget),
+        budget_by_head=budget_by_head,
+        variance_by_head=variance_by_head,
+        percent_over_under_budget=percent_over_under_budget,
+        total_contract_value=total_contract_value if total_contract_value > 0 else None,
+        profit_margin_target=float(proj.get("profit_margin_target") or 10.0),
+        current_profit_margin=current_profit_margin,
+        days_remaining=days_remaining,
+        job_costing_categories=cats,
+        recent_logs=recent_logs,
+    )
+
+
+_CATEGORIES_ORDER = ("Labour", "Materials", "Equipment", "Subcontractors", "Other")
+
+# Maps a cost head onto one of _CATEGORIES_ORDER, so the category roll-up
+# happens in the GROUP BY rather than in a Python loop over every cost head
+_CATEGORY_SQL = """
+    CASE
+        WHEN lower(cost_head) LIKE '%labour%' OR lower(cost_head) LIKE '%labor%' THEN 'Labour'
+        WHEN lower(cost_head) LIKE '%material%' THEN 'Materials'
+        WHEN lower(cost_head) LIKE '%machinery%' OR lower(cost_head) LIKE '%equipment%' THEN 'Equipment'
+        WHEN lower(cost_head) LIKE '%subcontract%' THEN 'Subcontractors'
+        ELSE 'Other'
+    END
+"""
+
+
+def _mongo_category_expr(field: str) -> dict[str, Any]:
+    """$switch equivalent of _CATEGORY_SQL for aggregation pipelines"""
+    head = {"$toLower": {"$ifNull": [field, ""]}}
+
+    def matches(*words: str) -> dict[str, Any]:
+        return {"$or": [{"$regexMatch": {"input": head, "regex": w}} for w in words]}
+
+    return {
+        "$switch": {
+            "branches": [
+                {"case": matches("labour", "labor"), "then": "Labour"},
+                {"case": matches("material"), "then": "Materials"},
+                {"case": matches("machinery", "equipment"), "then": "Equipment"},
+                {"case": matches("subcontract"), "then": "Subcontractors"},
+            ],
+            "default": "Other",
+        }
+    }
 
-        cur.execute(
-            """
-            SELECT cost_head, budget_amount
-            FROM budget_items
-            WHERE project_id = ?
-            """,
-            (project_id,),
-        )
-        budgets = rows_to_dict(cur.fetchall())
-
-    # Aggregate by category (same logic as job costing)
-    planned_by_cat: dict[str, float] = defaultdict(float)
-    actual_by_cat: dict[str, float] = defaultdict(float)
-    qty_by_cat: dict[str, float] = defaultdict(float)
-    uoms_by_cat: dict[str, set[str]] = defaultdict(set)
-
-    for b in budgets:
-        cat = _job_costing_category_for_head(str(b["cost_head"]))
-        planned_by_cat[cat] += float(b.get("budget_amount") or 0.0)
-
-    for c in costs:
-        cat = _job_costing_category_for_head(str(c["cost_head"]))
-        actual_by_cat[cat] += float(c.get("amt") or 0.0)
-        qty_by_cat[cat] += float(c.get("qty") or 0.0)
-        raw = str(c.get("uoms") or "")
-        for u in raw.split(","):
-            u = u.strip()
-            if u:
-                uoms_by_cat[cat].add(u)
-
-    categories_order = ["Labour", "Materials", "Equipment", "Subcontractors", "Other"]
-    total_planned = float(sum(planned_by_cat.values()))
-    total_actual = float(sum(actual_by_cat.values()))
+
+_COST_BY_CATEGORY_SQL = _date_range_variants(
+    f"""
+    SELECT {_CATEGORY_SQL} AS category,
+           SUM(amount) AS amt,
+           SUM(COALESCE(quantity, 0)) AS qty,
+           CASE WHEN COUNT(DISTINCT NULLIF(TRIM(uom), '')) = 1
+                THEN MAX(NULLIF(TRIM(uom), '')) END AS uom
+    FROM cost_entries
+    WHERE {{where}}
+    GROUP BY category
+    """,
+    "entry_date",
+)
+
+_BUDGET_BY_CATEGORY_SQL = f"""
+    SELECT {_CATEGORY_SQL} AS category, SUM(budget_amount) AS planned
+    FROM budget_items
+    WHERE project_id = ?
+    GROUP BY category
+"""
+
+
+def _sql_category_rollup(
+    cur, project_id: int, variant: tuple[bool, bool], params: tuple[Any, ...]
+) -> tuple[dict, dict]:
+    """Actual and planned cost per job-costing category, at most five rows each"""
+    cur.execute(_COST_BY_CATEGORY_SQL[variant], params)
+    actual_by_cat = {r["category"]: r for r in cur}
+
+    cur.execute(_BUDGET_BY_CATEGORY_SQL, (project_id,))
+    planned_by_cat = {r["category"]: float(r["planned"] or 0) for r in cur}
+    return actual_by_cat, planned_by_cat
+
+
+def _sql_job_costing_categories(actual_by_cat: dict, planned_by_cat: dict, total_actual: float) -> list[JobCostingCategory]:
+    pct_of_actual_scale = 100.0 / total_actual if total_actual > 0 else 0.0
 
     cats: list[JobCostingCategory] = []
-    for cat in categories_order:
-        planned = float(planned_by_cat.get(cat, 0.0))
-        actual = float(actual_by_cat.get(cat, 0.0))
-        qty = float(qty_by_cat.get(cat, 0.0))
-        uom_set = uoms_by_cat.get(cat, set())
-        uom = list(uom_set)[0] if len(uom_set) == 1 else None
+    for cat in _CATEGORIES_ORDER:
+        planned = planned_by_cat.get(cat, 0.0)
+        row = actual_by_cat.get(cat)
+        actual = float(row["amt"] or 0) if row else 0.0
+        qty = float(row["qty"] or 0) if row else 0.0
+        uom = row["uom"] if row else None
 
         unit_cost = None
         if qty > 0:
             unit_cost = float(actual / qty)
 
-        pct_of_total_actual = float((actual / total_actual) * 100.0) if total_actual > 0 else 0.0
+        pct_of_total_actual = actual * pct_of_actual_scale
         pct_over_under = None
         if planned > 0:
             pct_over_under = float(((actual - planned) / planned) * 100.0)
 
         cats.append(
-            JobCostingCategory(
+            JobCostingCategory.model_construct(
                 category=cat,
                 planned_cost=planned,
                 actual_cost=actual,
@@ -564,248 +840,148 @@ def summary(project_id: int, from_date: str | None = None, to_date: str | None =
                 percent_over_under_budget=pct_over_under,
             )
         )
+    return cats
+
 
-    return DashboardSummary(
+def _job_costing_sql(project_id: int, from_date: str | None, to_date: str | None) -> JobCostingSummary:
+    variant = (bool(from_date), bool(to_date))
+    params = _date_range_params(project_id, from_date, to_date)
+
+    # One cursor (and one pooled connection) serves all three queries
+    with db_cursor() as cur:
+        cur.execute("SELECT name, client, location FROM projects WHERE id = ?", (project_id,))
+        proj = cur.fetchone()
+        if not proj:
+            raise HTTPException(status_code=404, detail="Project not found")
+        actual_by_cat, planned_by_cat = _sql_category_rollup(cur, project_id, variant, params)
+
+    total_planned = float(sum(planned_by_cat.values()))
+    total_actual = float(sum(float(r["amt"] or 0) for r in actual_by_cat.values()))
+    total_pct_over_under = None
+    if total_planned > 0:
+        total_pct_over_under = float(((total_actual - total_planned) / total_planned) * 100.0)
+
+    return JobCostingSummary.model_construct(
         project_id=project_id,
+        project_name=str(proj["name"]),
+        client=str(proj["client"]),
+        location=str(proj["location"]),
         from_date=from_date,
         to_date=to_date,
-        total_cost=float(total_cost),
-        cost_by_head=dict(cost_by_head),
-        total_budget=float(total_budget),
-        budget_by_head=budget_by_head,
-        variance_by_head=variance_by_head,
-        percent_over_under_budget=percent_over_under_budget,
-        total_contract_value=total_contract_value if total_contract_value > 0 else None,
-        profit_margin_target=float(proj.get("profit_margin_target") or 10.0),
-        current_profit_margin=current_profit_margin,
-        days_remaining=days_remaining,
-        job_costing_categories=cats,
-        recent_logs=recent_logs,
+        total_planned_cost=total_planned,
+        total_actual_cost=total_actual,
+        percent_over_under_budget=total_pct_over_under,
+        categories=_sql_job_costing_categories(actual_by_cat, planned_by_cat, total_actual),
     )
 
 
-def _job_costing_category_for_head(cost_head: str) -> str:
-    h = (cost_head or "").lower()
-    if "labour" in h or "labor" in h:
-        return "Labour"
-    if "material" in h:
-        return "Materials"
-    if "machinery" in h or "equipment" in h:
-        return "Equipment"
-    if "subcontract" in h:
-        return "Subcontractors"
-    return "Other"
-
-
 @app.get("/projects/{project_id}/job-costing", response_model=JobCostingSummary)
+@_json_endpoint
 async def job_costing(project_id: str, from_date: str | None = None, to_date: str | None = None) -> JobCostingSummary:
     if not DB_AVAILABLE:
-        # Return mock job costing data when database is not available
-        return JobCostingSummary(
-            project_id=project_id,
-            project_name="Railway ROB + Bridge Works (Pile Foundation & Sub-Structure)",
-            total_budget=8350000,
-            total_actual_cost=8642040,
-            total_variance=32040,
-            percent_over_under_budget=3.87,
-            categories=[
-                JobCostingCategory(
-                    category="Labour",
-                    planned_cost=3250000,
-                    actual_cost=3779500,
-                    quantity=3250,
-                    uom="Hours",
-                    unit_cost=1161.54,
-                    percent_of_total_actual=43.73,
-                    percent_over_under_budget=16.15
-                ),
-                JobCostingCategory(
-                    category="Materials",
-                    planned_cost=3200000,
-                    actual_cost=3315000,
-                    quantity=81.5,
-                    uom="MT/CuM",
-                    unit_cost=None,
-                    percent_of_total_actual=38.37,
-                    percent_over_under_budget=3.59
-                ),
-                JobCostingCategory(
-                    category="Equipment",
-                    planned_cost=1500000,
-                    actual_cost=0,
-                    quantity=None,
-                    uom=None,
-                    unit_cost=None,
-                    percent_of_total_actual=0,
-                    percent_over_under_budget=-100
-                ),
-                JobCostingCategory(
-                    category="Subcontractors",
-                    planned_cost=400000,
-                    actual_cost=1547540,
-                    quantity=None,
-                    uom=None,
-                    unit_cost=None,
-                    percent_of_total_actual=17.91,
-                    percent_over_under_budget=286.89
-                )
-            ]
+        # Same figures for every project, but echo the id that was asked for
+        pid = int(project_id) if project_id.isdigit() else project_id
+        return _MOCK_JOB_COSTING.model_copy(update={"project_id": pid})
+    return await _job_costing(project_id, from_date, to_date)
+
+
+@cache.cached
+async def _job_costing(project_id: str, from_date: str | None, to_date: str | None) -> JobCostingSummary:
+    if db.BACKEND != "mongo":
+        try:
+            pid = int(project_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return await asyncio.to_thread(_job_costing_sql, pid, from_date, to_date)
+
+    # Only the header fields are needed, so read them straight off the
+    # collection instead of hydrating and validating a whole Project document
+    project = None
+    if ObjectId.is_valid(project_id):
+        project = await models.Project.get_motor_collection().find_one(
+            {"_id": ObjectId(project_id)}, {"name": 1, "client": 1, "location": 1}
         )
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
 
-    try:
-        # Get project details
-        project = await Project.get(project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
+    # Build query for cost entries
+    query_filter = {"project_id": project_id}
+    if from_date:
+        query_filter["entry_date"] = {"$gte": from_date}
+    if to_date:
+        if "entry_date" not in query_filter:
+            query_filter["entry_date"] = {}
+        query_filter["entry_date"]["$lte"] = to_date
+
+    # Aggregate cost entries and budgets straight into categories
+    pipeline = [
+        {"$match": query_filter},
+        {"$group": {
+            "_id": _mongo_category_expr("$cost_head"),
+            "total_amount": {"$sum": "$amount"},
+            "total_quantity": {"$sum": {"$ifNull": ["$quantity", 0]}},
+            "uoms": {"$addToSet": {"$trim": {"input": {"$ifNull": ["$uom", ""]}}}}
+        }}
+    ]
+    budget_pipeline = [
+        {"$match": {"project_id": project_id}},
+        {"$group": {
+            "_id": _mongo_category_expr("$cost_head"),
+            "planned": {"$sum": "$budget_amount"},
+        }}
+    ]
+
+    # Both roll-ups run server-side and don't depend on each other
+    actual_rows, planned_rows = await asyncio.gather(
+        models.CostEntry.aggregate(pipeline).to_list(),
+        models.BudgetItem.aggregate(budget_pipeline).to_list(),
+    )
+    actual_by_cat = {a["_id"]: a for a in actual_rows}
+    planned_by_cat = {b["_id"]: float(b["planned"]) for b in planned_rows}
 
-        # Build query for cost entries
-        query_filter = {"project_id": project_id}
-        if from_date:
-            query_filter["entry_date"] = {"$gte": from_date}
-        if to_date:
-            if "entry_date" not in query_filter:
-                query_filter["entry_date"] = {}
-            query_filter["entry_date"]["$lte"] = to_date
-
-        # Aggregate cost entries by cost_head
-        pipeline = [
-            {"$match": query_filter},
-            {"$group": {
-                "_id": "$cost_head",
-                "total_amount": {"$sum": "$amount"},
-                "total_quantity": {"$sum": {"$ifNull": ["$quantity", 0]}},
-                "uoms": {"$addToSet": {"$ifNull": ["$uom", ""]}}
-            }}
-        ]
-
-        cost_aggregates = await CostEntry.aggregate(pipeline).to_list()
-
-        # Get budget items
-        budget_items = await BudgetItem.find(BudgetItem.project_id == project_id).to_list()
-
-        # Aggregate by category
-        planned_by_cat: dict[str, float] = defaultdict(float)
-        actual_by_cat: dict[str, float] = defaultdict(float)
-        qty_by_cat: dict[str, float] = defaultdict(float)
-        uoms_by_cat: dict[str, set[str]] = defaultdict(set)
-
-        for budget in budget_items:
-            cat = _job_costing_category_for_head(budget.cost_head)
-            planned_by_cat[cat] += budget.budget_amount
-
-        for cost_agg in cost_aggregates:
-            cat = _job_costing_category_for_head(cost_agg["_id"])
-            actual_by_cat[cat] += cost_agg["total_amount"]
-            qty_by_cat[cat] += cost_agg["total_quantity"]
-            for uom in cost_agg["uoms"]:
-                if uom and uom.strip():
-                    uoms_by_cat[cat].add(uom.strip())
-
-        categories_order = ["Labour", "Materials", "Equipment", "Subcontractors", "Other"]
-        total_planned = float(sum(planned_by_cat.values()))
-        total_actual = float(sum(actual_by_cat.values()))
-        total_pct_over_under = None
-        if total_planned > 0:
-            total_pct_over_under = float(((total_actual - total_planned) / total_planned) * 100.0)
-
-        cats: list[JobCostingCategory] = []
-        for cat in categories_order:
-            planned = float(planned_by_cat.get(cat, 0.0))
-            actual = float(actual_by_cat.get(cat, 0.0))
-            qty = float(qty_by_cat.get(cat, 0.0))
-            uom_set = uoms_by_cat.get(cat, set())
-            uom = list(uom_set)[0] if len(uom_set) == 1 else None
-
-            unit_cost = None
-            if qty > 0:
-                unit_cost = float(actual / qty)
-
-            pct_of_total_actual = float((actual / total_actual) * 100.0) if total_actual > 0 else 0.0
-            pct_over_under = None
-            if planned > 0:
-                pct_over_under = float(((actual - planned) / planned) * 100.0)
-
-            cats.append(
-                JobCostingCategory(
-                    category=cat,
-                    planned_cost=planned,
-                    actual_cost=actual,
-                    quantity=qty if qty > 0 else None,
-                    uom=uom,
-                    unit_cost=unit_cost,
-                    percent_of_total_actual=pct_of_total_actual,
-                    percent_over_under_budget=pct_over_under,
-                )
-            )
+    total_planned = float(sum(planned_by_cat.values()))
+    total_actual = float(sum(a["total_amount"] for a in actual_by_cat.values()))
+    pct_of_actual_scale = 100.0 / total_actual if total_actual > 0 else 0.0
+    total_pct_over_under = None
+    if total_planned > 0:
+        total_pct_over_under = float(((total_actual - total_planned) / total_planned) * 100.0)
 
-        return JobCostingSummary(
-            project_id=project_id,
-            project_name=project.name,
-            total_budget=total_planned,
-            total_actual_cost=total_actual,
-            total_variance=total_actual - total_planned,
-            percent_over_under_budget=((total_actual - total_planned) / total_planned * 100) if total_planned > 0 else 0.0,
-            categories=cats,
-        )
-    except Exception as e:
-        print(f"Database query failed in job_costing: {e}")
-        # Fallback to mock data
-        return JobCostingSummary(
-            project_id=project_id,
-            project_name="Railway ROB + Bridge Works (Pile Foundation & Sub-Structure)",
-            total_budget=8350000,
-            total_actual_cost=8642040,
-            total_variance=32040,
-            percent_over_under_budget=3.87,
-            categories=[
-                JobCostingCategory(
-                    category="Labour",
-                    planned_cost=3250000,
-                    actual_cost=3779500,
-                    quantity=3250,
-                    uom="Hours",
-                    unit_cost=1161.54,
-                    percent_of_total_actual=43.73,
-                    percent_over_under_budget=16.15
-                ),
-                JobCostingCategory(
-                    category="Materials",
-                    planned_cost=3200000,
-                    actual_cost=3315000,
-                    quantity=81.5,
-                    uom="MT/CuM",
-                    unit_cost=None,
-                    percent_of_total_actual=38.37,
-                    percent_over_under_budget=3.59
-                ),
-                JobCostingCategory(
-                    category="Equipment",
-                    planned_cost=1500000,
-                    actual_cost=0,
-                    quantity=None,
-                    uom=None,
-                    unit_cost=None,
-                    percent_of_total_actual=0,
-                    percent_over_under_budget=-100
-                ),
-                JobCostingCategory(
-                    category="Subcontractors",
-                    planned_cost=400000,
-                    actual_cost=1547540,
-                    quantity=None,
-                    uom=None,
-                    unit_cost=None,
-                    percent_of_total_actual=17.91,
-                    percent_over_under_budget=286.89
-                )
-            ]
+    cats: list[JobCostingCategory] = []
+    for cat in _CATEGORIES_ORDER:
+        planned = planned_by_cat.get(cat, 0.0)
+        agg = actual_by_cat.get(cat)
+        actual = float(agg["total_amount"]) if agg else 0.0
+        qty = float(agg["total_quantity"]) if agg else 0.0
+        uom_set = {u for u in agg["uoms"] if u} if agg else set()
+        uom = next(iter(uom_set)) if len(uom_set) == 1 else None
+
+        unit_cost = None
+        if qty > 0:
+            unit_cost = float(actual / qty)
+
+        pct_of_total_actual = actual * pct_of_actual_scale
+        pct_over_under = None
+        if planned > 0:
+            pct_over_under = float(((actual - planned) / planned) * 100.0)
+
+        cats.append(
+            JobCostingCategory.model_construct(
+                category=cat,
+                planned_cost=planned,
+                actual_cost=actual,
+                quantity=qty if qty > 0 else None,
+                uom=uom,
+                unit_cost=unit_cost,
+                percent_of_total_actual=pct_of_total_actual,
+                percent_over_under_budget=pct_over_under,
+            )
         )
 
-    return JobCostingSummary(
+    return JobCostingSummary.model_construct(
         project_id=project_id,
-        project_name=str(proj_d["name"]),
-        client=str(proj_d["client"]),
-        location=str(proj_d["location"]),
+        project_name=project["name"],
+        client=project["client"],
+        location=project["location"],
         from_date=from_date,
         to_date=to_date,
         total_planned_cost=total_planned,
@@ -817,454 +993,176 @@ async def job_costing(project_id: str, from_date: str | None = None, to_date: st
 
 # ========== COMPREHENSIVE KPI ENDPOINTS ==========
 
-# ---------- Project Packages ----------
-@app.get("/projects/{project_id}/packages", response_model=list[ProjectPackage])
-def list_project_packages(project_id: int) -> list[ProjectPackage]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM project_packages WHERE project_id = ? ORDER BY id DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [ProjectPackage(**row_to_dict(r)) for r in rows]
-
-@app.post("/project-packages", response_model=ProjectPackage)
-def create_project_package(payload: ProjectPackageCreate) -> ProjectPackage:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO project_packages
-            (project_id, package_name, package_value, planned_start_date, planned_end_date,
-             actual_start_date, actual_end_date, status, progress_percentage)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.package_name, payload.package_value, payload.planned_start_date,
-             payload.planned_end_date, payload.actual_start_date, payload.actual_end_date,
-             payload.status, payload.progress_percentage),
-        )
-        pkg_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM project_packages WHERE id = ?;", (pkg_id,))
-        row = cur.fetchone()
-    return ProjectPackage(**row_to_dict(row))
-
-# ---------- Project Milestones ----------
-@app.get("/projects/{project_id}/milestones", response_model=list[ProjectMilestone])
-def list_project_milestones(project_id: int) -> list[ProjectMilestone]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM project_milestones WHERE project_id = ? ORDER BY planned_date;", (project_id,))
-        rows = cur.fetchall()
-    return [ProjectMilestone(**row_to_dict(r)) for r in rows]
-
-@app.post("/project-milestones", response_model=ProjectMilestone)
-def create_project_milestone(payload: ProjectMilestoneCreate) -> ProjectMilestone:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO project_milestones
-            (project_id, milestone_name, planned_date, actual_date, status, weight, description)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.milestone_name, payload.planned_date, payload.actual_date,
-             payload.status, payload.weight, payload.description),
-        )
-        ms_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM project_milestones WHERE id = ?;", (ms_id,))
-        row = cur.fetchone()
-    return ProjectMilestone(**row_to_dict(row))
-
-# ---------- Delay Reasons ----------
-@app.get("/projects/{project_id}/delay-reasons", response_model=list[DelayReason])
-def list_delay_reasons(project_id: int) -> list[DelayReason]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM delay_reasons WHERE project_id = ? ORDER BY delay_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [DelayReason(**row_to_dict(r)) for r in rows]
-
-@app.post("/delay-reasons", response_model=DelayReason)
-def create_delay_reason(payload: DelayReasonCreate) -> DelayReason:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO delay_reasons
-            (project_id, delay_date, delay_category, delay_hours, delay_days, description,
-             impact_on_schedule, mitigation_action, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.delay_date, payload.delay_category, payload.delay_hours,
-             payload.delay_days, payload.description, payload.impact_on_schedule,
-             payload.mitigation_action, payload.status),
-        )
-        dr_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM delay_reasons WHERE id = ?;", (dr_id,))
-        row = cur.fetchone()
-    return DelayReason(**row_to_dict(row))
-
-# ---------- RA Bills ----------
-@app.get("/projects/{project_id}/ra-bills", response_model=list[RABill])
-def list_ra_bills(project_id: int) -> list[RABill]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM ra_bills WHERE project_id = ? ORDER BY bill_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [RABill(**row_to_dict(r)) for r in rows]
-
-@app.post("/ra-bills", response_model=RABill)
-def create_ra_bill(payload: RABillCreate) -> RABill:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO ra_bills
-            (project_id, bill_no, bill_date, submitted_date, certified_date, paid_date,
-             bill_amount, certified_amount, paid_amount, retention_amount, status,
-             certification_cycle_days, payment_cycle_days)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.bill_no, payload.bill_date, payload.submitted_date,
-             payload.certified_date, payload.paid_date, payload.bill_amount, payload.certified_amount,
-             payload.paid_amount, payload.retention_amount, payload.status,
-             payload.certification_cycle_days, payload.payment_cycle_days),
-        )
-        bill_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM ra_bills WHERE id = ?;", (bill_id,))
-        row = cur.fetchone()
-    return RABill(**row_to_dict(row))
-
-# ---------- Claims & Variations ----------
-@app.get("/projects/{project_id}/claims-variations", response_model=list[ClaimsVariation])
-def list_claims_variations(project_id: int) -> list[ClaimsVariation]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM claims_variations WHERE project_id = ? ORDER BY submitted_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [ClaimsVariation(**row_to_dict(r)) for r in rows]
-
-@app.post("/claims-variations", response_model=ClaimsVariation)
-def create_claims_variation(payload: ClaimsVariationCreate) -> ClaimsVariation:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO claims_variations
-            (project_id, claim_type, description, claimed_amount, approved_amount, status,
-             submitted_date, approved_date, remarks)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.claim_type, payload.description, payload.claimed_amount,
-             payload.approved_amount, payload.status, payload.submitted_date,
-             payload.approved_date, payload.remarks),
-        )
-        cv_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM claims_variations WHERE id = ?;", (cv_id,))
-        row = cur.fetchone()
-    return ClaimsVariation(**row_to_dict(row))
-
-# ---------- BOQ Items ----------
-@app.get("/projects/{project_id}/boq-items", response_model=list[BOQItem])
-def list_boq_items(project_id: int) -> list[BOQItem]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM boq_items WHERE project_id = ? ORDER BY item_code;", (project_id,))
-        rows = cur.fetchall()
-    return [BOQItem(**row_to_dict(r)) for r in rows]
-
-@app.post("/boq-items", response_model=BOQItem)
-def create_boq_item(payload: BOQItemCreate) -> BOQItem:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO boq_items
-            (project_id, item_code, item_description, unit, boq_quantity, boq_rate, boq_amount,
-             executed_quantity, executed_amount, deviation_percentage, status, category)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.item_code, payload.item_description, payload.unit,
-             payload.boq_quantity, payload.boq_rate, payload.boq_amount, payload.executed_quantity,
-             payload.executed_amount, payload.deviation_percentage, payload.status, payload.category),
-        )
-        boq_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM boq_items WHERE id = ?;", (boq_id,))
-        row = cur.fetchone()
-    return BOQItem(**row_to_dict(row))
-
-# ---------- Quality Tests ----------
-@app.get("/projects/{project_id}/quality-tests", response_model=list[QualityTest])
-def list_quality_tests(project_id: int) -> list[QualityTest]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM quality_tests WHERE project_id = ? ORDER BY test_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [QualityTest(**row_to_dict(r)) for r in rows]
-
-@app.post("/quality-tests", response_model=QualityTest)
-def create_quality_test(payload: QualityTestCreate) -> QualityTest:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO quality_tests
-            (project_id, test_type, test_date, planned_tests, conducted_tests,
-             passed_tests, failed_tests, pass_rate, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.test_type, payload.test_date, payload.planned_tests,
-             payload.conducted_tests, payload.passed_tests, payload.failed_tests,
-             payload.pass_rate, payload.status),
-        )
-        qt_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM quality_tests WHERE id = ?;", (qt_id,))
-        row = cur.fetchone()
-    return QualityTest(**row_to_dict(row))
-
-# ---------- NCRs ----------
-@app.get("/projects/{project_id}/ncrs", response_model=list[NCR])
-def list_ncrs(project_id: int) -> list[NCR]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM ncrs WHERE project_id = ? ORDER BY raised_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [NCR(**row_to_dict(r)) for r in rows]
-
-@app.post("/ncrs", response_model=NCR)
-def create_ncr(payload: NCRCreate) -> NCR:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO ncrs
-            (project_id, ncr_no, raised_date, category, description, severity, status,
-             closure_date, closure_days, corrective_action)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.ncr_no, payload.raised_date, payload.category,
-             payload.description, payload.severity, payload.status, payload.closure_date,
-             payload.closure_days, payload.corrective_action),
-        )
-        ncr_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM ncrs WHERE id = ?;", (ncr_id,))
-        row = cur.fetchone()
-    return NCR(**row_to_dict(row))
-
-# ---------- Safety Incidents ----------
-@app.get("/projects/{project_id}/safety-incidents", response_model=list[SafetyIncident])
-def list_safety_incidents(project_id: int) -> list[SafetyIncident]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM safety_incidents WHERE project_id = ? ORDER BY incident_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [SafetyIncident(**row_to_dict(r)) for r in rows]
-
-@app.post("/safety-incidents", response_model=SafetyIncident)
-def create_safety_incident(payload: SafetyIncidentCreate) -> SafetyIncident:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO safety_incidents
-            (project_id, incident_date, incident_type, description, severity,
-             lost_time_days, reported_by, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.incident_date, payload.incident_type, payload.description,
-             payload.severity, payload.lost_time_days, payload.reported_by, payload.status),
-        )
-        si_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM safety_incidents WHERE id = ?;", (si_id,))
-        row = cur.fetchone()
-    return SafetyIncident(**row_to_dict(row))
-
-# ---------- Labour Manpower ----------
-@app.get("/projects/{project_id}/labour-manpower", response_model=list[LabourManpower])
-def list_labour_manpower(project_id: int) -> list[LabourManpower]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM labour_manpower WHERE project_id = ? ORDER BY record_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [LabourManpower(**row_to_dict(r)) for r in rows]
-
-@app.post("/labour-manpower", response_model=LabourManpower)
-def create_labour_manpower(payload: LabourManpowerCreate) -> LabourManpower:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO labour_manpower
-            (project_id, record_date, total_planned, total_actual, mason_count, carpenter_count,
-             bar_bender_count, welder_count, helper_count, absenteeism_rate, overtime_hours)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.record_date, payload.total_planned, payload.total_actual,
-             payload.mason_count, payload.carpenter_count, payload.bar_bender_count,
-             payload.welder_count, payload.helper_count, payload.absenteeism_rate, payload.overtime_hours),
-        )
-        lm_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM labour_manpower WHERE id = ?;", (lm_id,))
-        row = cur.fetchone()
-    return LabourManpower(**row_to_dict(row))
-
-# ---------- Plant & Machinery ----------
-@app.get("/projects/{project_id}/plant-machinery", response_model=list[PlantMachinery])
-def list_plant_machinery(project_id: int) -> list[PlantMachinery]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM plant_machinery WHERE project_id = ? ORDER BY record_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [PlantMachinery(**row_to_dict(r)) for r in rows]
+@dataclass(frozen=True)
+class _KpiTable:
+    table: str
+    model: type
+    create_model: type
+    list_path: str  # under /projects/{project_id}/
+    create_path: str
+    order_by: str
+    list_name: str  # handler names, which FastAPI uses as operation ids
+    create_name: str
+    cached: bool = False
+
+
+# Every KPI table gets the same three endpoints; they differ only in names,
+# models and sort order, so they're built from this table at import time
+_KPI_TABLES = (
+    _KpiTable("project_packages", ProjectPackage, ProjectPackageCreate, "packages", "project-packages",
+              "id DESC", "list_project_packages", "create_project_package", cached=True),
+    _KpiTable("project_milestones", ProjectMilestone, ProjectMilestoneCreate, "milestones", "project-milestones",
+              "planned_date", "list_project_milestones", "create_project_milestone"),
+    _KpiTable("delay_reasons", DelayReason, DelayReasonCreate, "delay-reasons", "delay-reasons",
+              "delay_date DESC", "list_delay_reasons", "create_delay_reason"),
+    _KpiTable("ra_bills", RABill, RABillCreate, "ra-bills", "ra-bills",
+              "bill_date DESC", "list_ra_bills", "create_ra_bill"),
+    _KpiTable("claims_variations", ClaimsVariation, ClaimsVariationCreate, "claims-variations", "claims-variations",
+              "submitted_date DESC", "list_claims_variations", "create_claims_variation"),
+    _KpiTable("boq_items", BOQItem, BOQItemCreate, "boq-items", "boq-items",
+              "item_code", "list_boq_items", "create_boq_item"),
+    _KpiTable("quality_tests", QualityTest, QualityTestCreate, "quality-tests", "quality-tests",
+              "test_date DESC", "list_quality_tests", "create_quality_test"),
+    _KpiTable("ncrs", NCR, NCRCreate, "ncrs", "ncrs",
+              "raised_date DESC", "list_ncrs", "create_ncr"),
+    _KpiTable("safety_incidents", SafetyIncident, SafetyIncidentCreate, "safety-incidents", "safety-incidents",
+              "incident_date DESC", "list_safety_incidents", "create_safety_incident"),
+    _KpiTable("labour_manpower", LabourManpower, LabourManpowerCreate, "labour-manpower", "labour-manpower",
+              "record_date DESC", "list_labour_manpower", "create_labour_manpower"),
+    _KpiTable("plant_machinery", PlantMachinery, PlantMachineryCreate, "plant-machinery", "plant-machinery",
+              "record_date DESC", "list_plant_machinery", "create_plant_machinery"),
+    _KpiTable("material_inventory", MaterialInventory, MaterialInventoryCreate, "material-inventory", "material-inventory",
+              "record_date DESC", "list_material_inventory", "create_material_inventory"),
+    _KpiTable("drawings_approvals", DrawingsApproval, DrawingsApprovalCreate, "drawings-approvals", "drawings-approvals",
+              "submitted_date DESC", "list_drawings_approvals", "create_drawings_approval"),
+    _KpiTable("railway_blocks", RailwayBlock, RailwayBlockCreate, "railway-blocks", "railway-blocks",
+              "block_date DESC", "list_railway_blocks", "create_railway_block"),
+    _KpiTable("risk_register", RiskRegister, RiskRegisterCreate, "risk-register", "risk-register",
+              "risk_level DESC", "list_risk_register", "create_risk_register"),
+)
 
-@app.post("/plant-machinery", response_model=PlantMachinery)
-def create_plant_machinery(payload: PlantMachineryCreate) -> PlantMachinery:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO plant_machinery
-            (project_id, equipment_name, equipment_type, record_date, available_hours, utilized_hours,
-             breakdown_hours, idle_hours, fuel_consumed, fuel_norm, availability_percentage,
-             utilization_percentage, mttr_hours, mtbf_hours)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.equipment_name, payload.equipment_type, payload.record_date,
-             payload.available_hours, payload.utilized_hours, payload.breakdown_hours, payload.idle_hours,
-             payload.fuel_consumed, payload.fuel_norm, payload.availability_percentage,
-             payload.utilization_percentage, payload.mttr_hours, payload.mtbf_hours),
-        )
-        pm_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM plant_machinery WHERE id = ?;", (pm_id,))
-        row = cur.fetchone()
-    return PlantMachinery(**row_to_dict(row))
 
-# ---------- Material Inventory ----------
-@app.get("/projects/{project_id}/material-inventory", response_model=list[MaterialInventory])
-def list_material_inventory(project_id: int) -> list[MaterialInventory]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM material_inventory WHERE project_id = ? ORDER BY record_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [MaterialInventory(**row_to_dict(r)) for r in rows]
+def _named(fn, name: str, annotations: dict[str, Any]):
+    fn.__name__ = fn.__qualname__ = name
+    fn.__annotations__ = annotations
+    return fn
 
-@app.post("/material-inventory", response_model=MaterialInventory)
-def create_material_inventory(payload: MaterialInventoryCreate) -> MaterialInventory:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO material_inventory
-            (project_id, material_type, record_date, issued_quantity, consumed_quantity,
-             theoretical_quantity, variance_percentage, stock_level, min_stock, max_stock, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.material_type, payload.record_date, payload.issued_quantity,
-             payload.consumed_quantity, payload.theoretical_quantity, payload.variance_percentage,
-             payload.stock_level, payload.min_stock, payload.max_stock, payload.status),
-        )
-        mi_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM material_inventory WHERE id = ?;", (mi_id,))
-        row = cur.fetchone()
-    return MaterialInventory(**row_to_dict(row))
 
-# ---------- Drawings & Approvals ----------
-@app.get("/projects/{project_id}/drawings-approvals", response_model=list[DrawingsApproval])
-def list_drawings_approvals(project_id: int) -> list[DrawingsApproval]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM drawings_approvals WHERE project_id = ? ORDER BY submitted_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [DrawingsApproval(**row_to_dict(r)) for r in rows]
+def _add_kpi_routes(spec: _KpiTable) -> None:
+    """Register the list, create and bulk-create endpoints for one KPI table.
 
-@app.post("/drawings-approvals", response_model=DrawingsApproval)
-def create_drawings_approval(payload: DrawingsApprovalCreate) -> DrawingsApproval:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO drawings_approvals
-            (project_id, drawing_no, drawing_type, submitted_date, approved_date,
-             approval_days, status, approver_name, remarks)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.drawing_no, payload.drawing_type, payload.submitted_date,
-             payload.approved_date, payload.approval_days, payload.status, payload.approver_name, payload.remarks),
-        )
-        da_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM drawings_approvals WHERE id = ?;", (da_id,))
-        row = cur.fetchone()
-    return DrawingsApproval(**row_to_dict(row))
+    SQL text and the payload getter are built once here rather than per call.
+    The create model's fields are exactly the table's insertable columns.
+    """
+    model, create_model = spec.model, spec.create_model
+    cols = tuple(create_model.model_fields)
+    values = attrgetter(*cols)
+    list_sql = f"SELECT {_columns(model)} FROM {spec.table} WHERE project_id = ? ORDER BY {spec.order_by};"
+    insert_sql = (
+        f"INSERT INTO {spec.table} ({', '.join(cols)}) "
+        f"VALUES ({', '.join('?' * len(cols))}) RETURNING *"
+    )
 
-# ---------- Railway Blocks ----------
-@app.get("/projects/{project_id}/railway-blocks", response_model=list[RailwayBlock])
-def list_railway_blocks(project_id: int) -> list[RailwayBlock]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM railway_blocks WHERE project_id = ? ORDER BY block_date DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [RailwayBlock(**row_to_dict(r)) for r in rows]
+    def list_rows(project_id):
+        with db_cursor(row_factory=None) as cur:
+            cur.execute(list_sql, (project_id,))
+            return fetch_dicts(cur)
+
+    def create(payload):
+        with db_cursor(write=True) as cur:
+            cur.execute(insert_sql, values(payload))
+            row = cur.fetchone()
+        cache.invalidate(payload.project_id)
+        return model.model_construct(**row_to_dict(row))
+
+    def create_bulk(payloads):
+        # One transaction and as few statements as the parameter limit allows
+        if not payloads:
+            return []
+        with db_cursor(write=True) as cur:
+            rows = bulk_insert(cur, spec.table, cols, [values(p) for p in payloads])
+        for project_id in {p.project_id for p in payloads}:
+            cache.invalidate(project_id)
+        return [model.model_construct(**d) for d in rows_to_dicts(rows)]
+
+    list_rows = _named(list_rows, spec.list_name, {"project_id": int, "return": list[model]})
+    if spec.cached:
+        list_rows = cache.cached(list_rows)
+    app.add_api_route(
+        f"/projects/{{project_id}}/{spec.list_path}", _json_endpoint(list_rows),
+        methods=["GET"], response_model=list[model],
+    )
+    app.add_api_route(
+        f"/{spec.create_path}", _named(create, spec.create_name, {"payload": create_model, "return": model}),
+        methods=["POST"], response_model=model,
+    )
+    app.add_api_route(
+        f"/{spec.create_path}/bulk",
+        _named(create_bulk, f"{spec.create_name}_bulk", {"payloads": list[create_model], "return": list[model]}),
+        methods=["POST"], response_model=list[model],
+    )
 
-@app.post("/railway-blocks", response_model=RailwayBlock)
-def create_railway_block(payload: RailwayBlockCreate) -> RailwayBlock:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO railway_blocks
-            (project_id, block_date, block_type, requested_hours, granted_hours,
-             utilized_hours, status, work_description)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.block_date, payload.block_type, payload.requested_hours,
-             payload.granted_hours, payload.utilized_hours, payload.status, payload.work_description),
-        )
-        rb_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM railway_blocks WHERE id = ?;", (rb_id,))
-        row = cur.fetchone()
-    return RailwayBlock(**row_to_dict(row))
 
-# ---------- Risk Register ----------
-@app.get("/projects/{project_id}/risk-register", response_model=list[RiskRegister])
-def list_risk_register(project_id: int) -> list[RiskRegister]:
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM risk_register WHERE project_id = ? ORDER BY risk_level DESC;", (project_id,))
-        rows = cur.fetchall()
-    return [RiskRegister(**row_to_dict(r)) for r in rows]
+for _spec in _KPI_TABLES:
+    _add_kpi_routes(_spec)
 
-@app.post("/risk-register", response_model=RiskRegister)
-def create_risk_register(payload: RiskRegisterCreate) -> RiskRegister:
-    with db_cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO risk_register
-            (project_id, risk_description, risk_category, probability, impact, risk_level,
-             exposure_amount, exposure_days, mitigation_plan, mitigation_status, rag_status, owner)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (payload.project_id, payload.risk_description, payload.risk_category, payload.probability,
-             payload.impact, payload.risk_level, payload.exposure_amount, payload.exposure_days,
-             payload.mitigation_plan, payload.mitigation_status, payload.rag_status, payload.owner),
-        )
-        rr_id = int(cur.lastrowid)
-        cur.execute("SELECT * FROM risk_register WHERE id = ?;", (rr_id,))
-        row = cur.fetchone()
-    return RiskRegister(**row_to_dict(row))
 
 # ---------- Comprehensive Dashboard KPI Summary ----------
 @app.get("/projects/{project_id}/comprehensive-dashboard", response_model=ComprehensiveDashboard)
+@_json_endpoint
+@cache.cached
 def get_comprehensive_dashboard(project_id: int) -> ComprehensiveDashboard:
     # This would be a complex aggregation of all KPIs
-    # For now, return a basic structure - would need full implementation
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM projects WHERE id = ?;", (project_id,))
+    # For now, return a basic structure - would need full implementation.
+    # The header is the only data read, so fetch just those two columns.
+    with db_cursor(row_factory=None) as cur:
+        cur.execute("SELECT name, client FROM projects WHERE id = ?;", (project_id,))
         proj = cur.fetchone()
-        if not proj:
-            raise HTTPException(status_code=404, detail="Project not found")
+    if not proj:
+        raise HTTPException(status_code=404, detail="Project not found")
+    name, client = proj
 
-        proj_d = row_to_dict(proj)
-
-        # Placeholder implementation - would need to aggregate all KPIs
-        return ComprehensiveDashboard(
-            project_id=project_id,
-            project_name=str(proj_d["name"]),
-            client=str(proj_d["client"]),
-            progress_kpis=None,  # Would need to implement aggregation
-            cost_billing_kpis=None,
-            quality_safety_kpis=None,
-            labour_productivity_kpis=None,
-            machinery_materials_kpis=None,
-            approvals_compliance_kpis=None,
-            risk_stakeholder_kpis=None
-        )
+    # Placeholder implementation - would need to aggregate all KPIs
+    return ComprehensiveDashboard.model_construct(
+        project_id=project_id,
+        project_name=str(name),
+        client=str(client),
+        progress_kpis=None,  # Would need to implement aggregation
+        cost_billing_kpis=None,
+        quality_safety_kpis=None,
+        labour_productivity_kpis=None,
+        machinery_materials_kpis=None,
+        approvals_compliance_kpis=None,
+        risk_stakeholder_kpis=None
+    )
 
 # ---------- Portfolio Overview ----------
+_ACTIVE_PROJECT_STATUSES = frozenset(("Planning", "Execution", "Monitoring"))
+
+
 @app.get("/portfolio-overview", response_model=PortfolioOverview)
+@_json_endpoint
+@cache.cached
 def get_portfolio_overview() -> PortfolioOverview:
     with db_cursor() as cur:
-        # Get project counts
-        cur.execute("SELECT COUNT(*) as total FROM projects;")
-        total_projects = int(cur.fetchone()["total"])
-
-        cur.execute("SELECT COUNT(*) as active FROM projects WHERE status IN ('Planning', 'Execution', 'Monitoring');")
-        active_projects = int(cur.fetchone()["active"])
-
-        cur.execute("SELECT COUNT(*) as delayed FROM projects WHERE status = 'Delayed';")
-        delayed_projects = int(cur.fetchone()["delayed"])
-
-        # Get financial totals
-        cur.execute("SELECT SUM(total_contract_value) as contract_value FROM projects;")
-        contract_value = float(cur.fetchone()["contract_value"] or 0)
+        # One grouped scan feeds the counts, the contract total and
+        # projects_by_status
+        cur.execute(
+            "SELECT status, COUNT(*) as count, SUM(total_contract_value) as contract_value "
+            "FROM projects GROUP BY status;"
+        )
+        projects_by_status: dict[Any, int] = {}
+        total_projects = active_projects = delayed_projects = 0
+        contract_value = 0.0
+        for row in cur:
+            status, count = row["status"], int(row["count"])
+            projects_by_status[status] = count
+            total_projects += count
+            if status in _ACTIVE_PROJECT_STATUSES:
+                active_projects += count
+            elif status == "Delayed":
+                delayed_projects += count
+            contract_value += float(row["contract_value"] or 0)
 
         # Placeholder for billed value - would need to sum RA bills
         billed_value = contract_value * 0.7  # Example
@@ -1278,11 +1176,7 @@ def get_portfolio_overview() -> PortfolioOverview:
         cur.execute("SELECT client, COUNT(*) as count FROM projects GROUP BY client;")
         projects_by_client = {row["client"]: row["count"] for row in cur.fetchall()}
 
-        # Projects by status
-        cur.execute("SELECT status, COUNT(*) as count FROM projects GROUP BY status;")
-        projects_by_status = {row["status"]: row["count"] for row in cur.fetchall()}
-
-        return PortfolioOverview(
+        return PortfolioOverview.model_construct(
             total_projects=total_projects,
             active_projects=active_projects,
             delayed_projects=delayed_projects,
@@ -1296,123 +1190,150 @@ def get_portfolio_overview() -> PortfolioOverview:
         )
 
 # ---------- AI Assistant ----------
-@app.post("/ai/chat", response_model=AiChatResponse)
-async def ai_chat(payload: AiChatRequest) -> AiChatResponse:
-    # Build a compact context from logs + activities + costs + budgets
-    with db_cursor() as cur:
-        cur.execute("SELECT * FROM projects WHERE id = ?;", (payload.project_id,))
-        proj = cur.fetchone()
-        if not proj:
-            raise HTTPException(status_code=404, detail="Project not found")
+# The 15 most recent logs joined to their latest few activities each, one
+# row per activity (or one bare row for a log without any). Capping per log
+# keeps one busy day from crowding every other log out of the context.
+_AI_ACTIVITIES_PER_LOG = 4
+_AI_LOGS_SQL = _date_range_variants(
+    f"""
+    WITH l AS (
+        SELECT id, log_date, weather, remarks FROM daily_logs
+        WHERE {{where}}
+        ORDER BY log_date DESC
+        LIMIT 15
+    )
+    SELECT l.id AS log_id, l.log_date, l.weather, l.remarks,
+           a.id AS activity_id, a.category, a.activity, a.quantity, a.uom,
+           a.labour_count, a.machinery
+    FROM l
+    LEFT JOIN (
+        SELECT id, daily_log_id, category, activity, quantity, uom, labour_count, machinery,
+               ROW_NUMBER() OVER (PARTITION BY daily_log_id ORDER BY id DESC) AS rn
+        FROM daily_activities
+        WHERE daily_log_id IN (SELECT id FROM l)
+    ) a ON a.daily_log_id = l.id AND a.rn <= {_AI_ACTIVITIES_PER_LOG}
+    ORDER BY l.log_date DESC, a.id DESC
+    """,
+    "log_date",
+)
+# Actual cost per head (in range) and budget per head, told apart by kind
+_AI_COST_HEADS_SQL = _date_range_variants(
+    """
+    SELECT * FROM (
+        SELECT 'cost' AS kind, cost_head, SUM(amount) AS amt
+        FROM cost_entries
+        WHERE {where}
+        GROUP BY cost_head
+    ) c
+    UNION ALL
+    SELECT 'budget' AS kind, cost_head, budget_amount AS amt
+    FROM budget_items
+    WHERE project_id = ?
+    ORDER BY kind DESC, amt DESC
+    """,
+    "entry_date",
+)
 
-        # Logs range
-        where_logs = ["project_id = ?"]
-        params_logs: list[Any] = [payload.project_id]
-        if payload.from_date:
-            where_logs.append("log_date >= ?")
-            params_logs.append(payload.from_date)
-        if payload.to_date:
-            where_logs.append("log_date <= ?")
-            params_logs.append(payload.to_date)
 
-        cur.execute(
-            f"""
-            SELECT * FROM daily_logs
-            WHERE {' AND '.join(where_logs)}
-            ORDER BY log_date DESC
-            LIMIT 15
-            """,
-            params_logs,
-        )
-        logs = cur.fetchall()
-
-        # Activities for those logs
-        log_ids = [int(r["id"]) for r in logs]
-        activities: list[dict[str, Any]] = []
-        if log_ids:
-            placeholders = ",".join(["?"] * len(log_ids))
-            cur.execute(
-                f"""
-                SELECT a.*, l.log_date
-                FROM daily_activities a
-                JOIN daily_logs l ON l.id = a.daily_log_id
-                WHERE a.daily_log_id IN ({placeholders})
-                ORDER BY l.log_date DESC, a.id DESC
-                LIMIT 60
-                """,
-                log_ids,
-            )
-            activities = rows_to_dicts(cur.fetchall())
-
-        # Costs range
-        where_cost = ["project_id = ?"]
-        params_cost: list[Any] = [payload.project_id]
-        if payload.from_date:
-            where_cost.append("entry_date >= ?")
-            params_cost.append(payload.from_date)
-        if payload.to_date:
-            where_cost.append("entry_date <= ?")
-            params_cost.append(payload.to_date)
-        cur.execute(
-            f"""
-            SELECT cost_head, SUM(amount) AS amt
-            FROM cost_entries
-            WHERE {' AND '.join(where_cost)}
-            GROUP BY cost_head
-            ORDER BY amt DESC
-            """,
-            params_cost,
-        )
-        cost_heads = rows_to_dicts(cur.fetchall())
+# Free-text fields are cut to this many characters in the AI context. With
+# the row limits above this bounds the prompt size (a few thousand tokens at
+# most) no matter what was typed into a log or cost entry
+_AI_TEXT_LIMIT = 120
 
-        cur.execute(
-            """
-            SELECT cost_head, budget_amount
-            FROM budget_items
-            WHERE project_id = ?
-            ORDER BY budget_amount DESC
-            """,
-            (payload.project_id,),
-        )
-        budgets = rows_to_dicts(cur.fetchall())
 
-    proj_d = row_to_dict(proj)
+def _ai_clip(text: str | None) -> str | None:
+    return text[:_AI_TEXT_LIMIT] if text else text
 
-    # Build readable context text
-    ctx_lines: list[str] = []
-    ctx_lines.append(f"Project: {proj_d['name']}")
-    ctx_lines.append(f"Client: {proj_d['client']} | Location: {proj_d['location']} | Contract: {proj_d.get('contract_no')}")
-    if payload.from_date or payload.to_date:
-        ctx_lines.append(f"Range: {payload.from_date or '...'} to {payload.to_date or '...'}")
-    ctx_lines.append("")
-
-    if logs:
-        ctx_lines.append("Recent daily logs (top 15):")
-        for r in logs[:15]:
-            ctx_lines.append(f"- {r['log_date']}: Weather={r['weather'] or '-'} | Remarks={r['remarks'] or '-'}")
-        ctx_lines.append("")
-
-    if activities:
-        ctx_lines.append("Recent activities (top 60):")
-        for a in activities[:60]:
-            ctx_lines.append(
-                f"- {a['log_date']} [{a['category']}] {a['activity']} | Qty {a['quantity']} {a['uom']} | Labour {a['labour_count']} | Mach {a.get('machinery') or '-'}"
+
+def _fetch_tuples(sql: str, params: tuple) -> list[tuple]:
+    with db_cursor(row_factory=None) as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+async def _ai_chat_context(payload: AiChatRequest) -> str:
+    # Build a compact context from logs + activities + costs + budgets.
+    # The three queries are independent, so each runs on its own worker
+    # thread and pooled reader connection; rows are plain tuples in the
+    # column order of the queries above.
+    variant = (bool(payload.from_date), bool(payload.to_date))
+    params = _date_range_params(payload.project_id, payload.from_date, payload.to_date)
+    proj_rows, log_rows, heads = await asyncio.gather(
+        asyncio.to_thread(
+            _fetch_tuples,
+            "SELECT name, client, location, contract_no FROM projects WHERE id = ?;",
+            (payload.project_id,),
+        ),
+        asyncio.to_thread(_fetch_tuples, _AI_LOGS_SQL[variant], params),
+        asyncio.to_thread(_fetch_tuples, _AI_COST_HEADS_SQL[variant], (*params, payload.project_id)),
+    )
+    if not proj_rows:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    logs: dict[int, str] = {}
+    # Activities grouped under one "date [category]" header each, so the
+    # prefix shared by a day's entries is sent to the model only once
+    activity_groups: dict[tuple[str, str], list[str]] = {}
+    for log_id, log_date, weather, remarks, activity_id, category, activity, qty, uom, labour, mach in log_rows:
+        if log_id not in logs:
+            logs[log_id] = f"- {log_date}: Weather={weather or '-'} | Remarks={_ai_clip(remarks) or '-'}"
+        if activity_id is not None:
+            activity_groups.setdefault((log_date, category), []).append(
+                f"  - {_ai_clip(activity)} | Qty {qty} {uom} | Labour {labour} | Mach {_ai_clip(mach) or '-'}"
             )
-        ctx_lines.append("")
 
-    if cost_heads:
-        ctx_lines.append("Costs by head (sum):")
-        for c in cost_heads[:15]:
-            ctx_lines.append(f"- {c['cost_head']}: {float(c['amt'] or 0):.2f}")
-        ctx_lines.append("")
+    activities = [
+        line
+        for (log_date, category), lines in activity_groups.items()
+        for line in (f"- {log_date} [{category}]", *lines)
+    ]
+    cost_heads = [f"- {_ai_clip(head)}: {float(amt or 0):.2f}" for kind, head, amt in heads if kind == "cost"][:15]
+    budgets = [f"- {_ai_clip(head)}: {float(amt or 0):.2f}" for kind, head, amt in heads if kind == "budget"][:20]
+
+    name, client, location, contract_no = proj_rows[0]
+    header = [f"Project: {name}", f"Client: {client} | Location: {location} | Contract: {contract_no}"]
+    if payload.from_date or payload.to_date:
+        header.append(f"Range: {payload.from_date or '...'} to {payload.to_date or '...'}")
+    sections = (
+        ("Recent daily logs (top 15):", logs.values()),
+        (f"Recent activities (latest {_AI_ACTIVITIES_PER_LOG} per log):", activities),
+        ("Costs by head (sum):", cost_heads),
+        ("Budget heads:", budgets),
+    )
+    # One join over every line; empty sections are left out entirely
+    return "\n".join(chain(
+        header,
+        ("",),
+        chain.from_iterable((heading, *lines, "") for heading, lines in sections if lines),
+    )).strip()
 
-    if budgets:
-        ctx_lines.append("Budget heads:")
-        for b in budgets[:20]:
-            ctx_lines.append(f"- {b['cost_head']}: {float(b['budget_amount'] or 0):.2f}")
-        ctx_lines.append("")
 
-    context = "\n".join(ctx_lines).strip()
+@app.post("/ai/chat", response_model=AiChatResponse)
+async def ai_chat(payload: AiChatRequest) -> AiChatResponse:
+    context = await _ai_chat_context(payload)
     res = await ai_answer(payload.question, context)
     return AiChatResponse(mode=res.mode, answer=res.answer)
 
+
+async def _sse_events(results):
+    async for res in results:
+        yield b"data: " + to_json(res) + b"\n\n"
+    yield b"data: [DONE]\n\n"
+
+
+@app.post("/ai/chat/stream", response_class=StreamingResponse)
+async def ai_chat_stream(payload: AiChatRequest) -> StreamingResponse:
+    """Server-sent events version of /ai/chat.
+
+    Each event's data is an AiChatResponse-shaped object holding the next
+    piece of the answer; the stream ends with "data: [DONE]". Answers start
+    showing after the first tokens instead of after the whole completion.
+    """
+    # Built before the stream starts so an unknown project is still a 404
+    context = await _ai_chat_context(payload)
+    return StreamingResponse(
+        _sse_events(ai_answer_stream(payload.question, context)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
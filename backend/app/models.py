@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 
 # Base model with common fields
@@ -10,9 +11,10 @@ class BaseDocument(Document):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
-    class Settings:
-        use_revision = True
-        use_state_management = True
+    # No Settings here: Beanie only reads a model's own Settings class, so
+    # the use_revision/use_state_management flags that sat here never took
+    # effect. The collections are append-only; a model that starts updating
+    # documents in place can opt in on its own Settings.
 
 
 # Core Project Management Models
@@ -42,6 +44,7 @@ class DailyLog(BaseDocument):
 
     class Settings:
         name = "daily_logs"
+        indexes = [IndexModel([("project_id", ASCENDING), ("log_date", DESCENDING)])]
 
 
 class DailyActivity(BaseDocument):
@@ -73,6 +76,8 @@ class CostEntry(BaseDocument):
 
     class Settings:
         name = "cost_entries"
+        # job_costing matches project_id plus an entry_date range
+        indexes = [IndexModel([("project_id", ASCENDING), ("entry_date", DESCENDING)])]
 
 
 class BudgetItem(BaseDocument):
@@ -83,6 +88,7 @@ class BudgetItem(BaseDocument):
 
     class Settings:
         name = "budget_items"
+        indexes = [IndexModel([("project_id", ASCENDING), ("cost_head", ASCENDING)])]
 
 
 # Project Progress KPIs
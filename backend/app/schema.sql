@@ -0,0 +1,351 @@
+-- Plain INTEGER PRIMARY KEY ids are rowid aliases. Unlike AUTOINCREMENT they
+-- skip the sqlite_sequence read+write on every insert. The only difference is
+-- that the id of a deleted last row may be handed out again.
+CREATE TABLE IF NOT EXISTS projects (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL,
+  client TEXT NOT NULL,
+  location TEXT NOT NULL,
+  contract_no TEXT,
+  start_date TEXT,
+  end_date TEXT,
+  total_contract_value REAL,
+  profit_margin_target REAL DEFAULT 10.0,
+  status TEXT NOT NULL DEFAULT 'Planning',
+  created_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE TABLE IF NOT EXISTS daily_logs (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  log_date TEXT NOT NULL,
+  weather TEXT,
+  remarks TEXT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS daily_activities (
+  id INTEGER PRIMARY KEY,
+  daily_log_id INTEGER NOT NULL,
+  category TEXT NOT NULL,
+  activity TEXT NOT NULL,
+  uom TEXT NOT NULL,
+  quantity REAL NOT NULL DEFAULT 0,
+  labour_count INTEGER NOT NULL DEFAULT 0,
+  machinery TEXT,
+  notes TEXT,
+  FOREIGN KEY(daily_log_id) REFERENCES daily_logs(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS cost_entries (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  entry_date TEXT NOT NULL,
+  cost_head TEXT NOT NULL,
+  description TEXT NOT NULL,
+  vendor TEXT,
+  amount REAL NOT NULL,
+  quantity REAL,
+  uom TEXT,
+  unit_rate REAL,
+  payment_mode TEXT,
+  bill_no TEXT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS budget_items (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  cost_head TEXT NOT NULL,
+  budget_amount REAL NOT NULL,
+  notes TEXT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  UNIQUE(project_id, cost_head),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+-- Per-project date-range filters and the daily log -> activities join
+CREATE INDEX IF NOT EXISTS idx_cost_entries_pid_date ON cost_entries(project_id, entry_date);
+CREATE INDEX IF NOT EXISTS idx_daily_logs_pid_date ON daily_logs(project_id, log_date);
+CREATE INDEX IF NOT EXISTS idx_daily_activities_log ON daily_activities(daily_log_id);
+
+-- KPI tables behind the generic list/create/bulk routes in main.py
+-- (_KPI_TABLES). Columns follow the matching *Create schemas.
+
+CREATE TABLE IF NOT EXISTS project_packages (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  package_name TEXT NOT NULL,
+  package_value REAL NOT NULL DEFAULT 0,
+  planned_start_date TEXT,
+  planned_end_date TEXT,
+  actual_start_date TEXT,
+  actual_end_date TEXT,
+  status TEXT NOT NULL DEFAULT 'Not Started',
+  progress_percentage REAL NOT NULL DEFAULT 0,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS project_milestones (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  milestone_name TEXT NOT NULL,
+  planned_date TEXT,
+  actual_date TEXT,
+  status TEXT NOT NULL DEFAULT 'Planned',
+  weight REAL NOT NULL DEFAULT 0,
+  description TEXT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS delay_reasons (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  delay_date TEXT NOT NULL,
+  delay_category TEXT NOT NULL,
+  delay_hours REAL NOT NULL DEFAULT 0,
+  delay_days REAL NOT NULL DEFAULT 0,
+  description TEXT,
+  impact_on_schedule TEXT,
+  mitigation_action TEXT,
+  status TEXT NOT NULL DEFAULT 'Active',
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS ra_bills (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  bill_no TEXT NOT NULL,
+  bill_date TEXT,
+  submitted_date TEXT,
+  certified_date TEXT,
+  paid_date TEXT,
+  bill_amount REAL NOT NULL DEFAULT 0,
+  certified_amount REAL NOT NULL DEFAULT 0,
+  paid_amount REAL NOT NULL DEFAULT 0,
+  retention_amount REAL NOT NULL DEFAULT 0,
+  status TEXT NOT NULL DEFAULT 'Draft',
+  certification_cycle_days INTEGER,
+  payment_cycle_days INTEGER,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS claims_variations (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  claim_type TEXT NOT NULL,
+  description TEXT,
+  claimed_amount REAL NOT NULL DEFAULT 0,
+  approved_amount REAL NOT NULL DEFAULT 0,
+  status TEXT NOT NULL DEFAULT 'Submitted',
+  submitted_date TEXT,
+  approved_date TEXT,
+  remarks TEXT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS boq_items (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  item_code TEXT,
+  item_description TEXT NOT NULL,
+  unit TEXT,
+  boq_quantity REAL NOT NULL DEFAULT 0,
+  boq_rate REAL NOT NULL DEFAULT 0,
+  boq_amount REAL NOT NULL DEFAULT 0,
+  executed_quantity REAL NOT NULL DEFAULT 0,
+  executed_amount REAL NOT NULL DEFAULT 0,
+  deviation_percentage REAL NOT NULL DEFAULT 0,
+  status TEXT NOT NULL DEFAULT 'Active',
+  category TEXT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS quality_tests (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  test_type TEXT NOT NULL,
+  test_date TEXT,
+  planned_tests INTEGER NOT NULL DEFAULT 0,
+  conducted_tests INTEGER NOT NULL DEFAULT 0,
+  passed_tests INTEGER NOT NULL DEFAULT 0,
+  failed_tests INTEGER NOT NULL DEFAULT 0,
+  pass_rate REAL NOT NULL DEFAULT 0,
+  status TEXT NOT NULL DEFAULT 'Planned',
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS ncrs (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  ncr_no TEXT NOT NULL,
+  raised_date TEXT,
+  category TEXT,
+  description TEXT,
+  severity TEXT NOT NULL DEFAULT 'Minor',
+  status TEXT NOT NULL DEFAULT 'Open',
+  closure_date TEXT,
+  closure_days INTEGER,
+  corrective_action TEXT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS safety_incidents (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  incident_date TEXT,
+  incident_type TEXT,
+  description TEXT,
+  severity TEXT NOT NULL DEFAULT 'Minor',
+  lost_time_days INTEGER NOT NULL DEFAULT 0,
+  reported_by TEXT,
+  status TEXT NOT NULL DEFAULT 'Reported',
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS labour_manpower (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  record_date TEXT NOT NULL,
+  total_planned INTEGER NOT NULL DEFAULT 0,
+  total_actual INTEGER NOT NULL DEFAULT 0,
+  mason_count INTEGER NOT NULL DEFAULT 0,
+  carpenter_count INTEGER NOT NULL DEFAULT 0,
+  bar_bender_count INTEGER NOT NULL DEFAULT 0,
+  welder_count INTEGER NOT NULL DEFAULT 0,
+  helper_count INTEGER NOT NULL DEFAULT 0,
+  absenteeism_rate REAL NOT NULL DEFAULT 0,
+  overtime_hours REAL NOT NULL DEFAULT 0,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS plant_machinery (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  equipment_name TEXT NOT NULL,
+  equipment_type TEXT,
+  record_date TEXT,
+  available_hours REAL NOT NULL DEFAULT 0,
+  utilized_hours REAL NOT NULL DEFAULT 0,
+  breakdown_hours REAL NOT NULL DEFAULT 0,
+  idle_hours REAL NOT NULL DEFAULT 0,
+  fuel_consumed REAL NOT NULL DEFAULT 0,
+  fuel_norm REAL NOT NULL DEFAULT 0,
+  availability_percentage REAL NOT NULL DEFAULT 0,
+  utilization_percentage REAL NOT NULL DEFAULT 0,
+  mttr_hours REAL NOT NULL DEFAULT 0,
+  mtbf_hours REAL NOT NULL DEFAULT 0,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS material_inventory (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  material_type TEXT NOT NULL,
+  record_date TEXT,
+  issued_quantity REAL NOT NULL DEFAULT 0,
+  consumed_quantity REAL NOT NULL DEFAULT 0,
+  theoretical_quantity REAL NOT NULL DEFAULT 0,
+  variance_percentage REAL NOT NULL DEFAULT 0,
+  stock_level REAL NOT NULL DEFAULT 0,
+  min_stock REAL NOT NULL DEFAULT 0,
+  max_stock REAL NOT NULL DEFAULT 0,
+  status TEXT NOT NULL DEFAULT 'Normal',
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS drawings_approvals (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  drawing_no TEXT NOT NULL,
+  drawing_type TEXT,
+  submitted_date TEXT,
+  approved_date TEXT,
+  approval_days INTEGER,
+  status TEXT NOT NULL DEFAULT 'Submitted',
+  approver_name TEXT,
+  remarks TEXT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS railway_blocks (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  block_date TEXT,
+  block_type TEXT,
+  requested_hours REAL NOT NULL DEFAULT 0,
+  granted_hours REAL NOT NULL DEFAULT 0,
+  utilized_hours REAL NOT NULL DEFAULT 0,
+  status TEXT NOT NULL DEFAULT 'Requested',
+  work_description TEXT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS risk_register (
+  id INTEGER PRIMARY KEY,
+  project_id INTEGER NOT NULL,
+  risk_description TEXT NOT NULL,
+  risk_category TEXT,
+  probability TEXT NOT NULL DEFAULT 'Medium',
+  impact TEXT NOT NULL DEFAULT 'Medium',
+  risk_level TEXT NOT NULL DEFAULT 'Medium',
+  exposure_amount REAL NOT NULL DEFAULT 0,
+  exposure_days INTEGER NOT NULL DEFAULT 0,
+  mitigation_plan TEXT,
+  mitigation_status TEXT NOT NULL DEFAULT 'Planned',
+  rag_status TEXT NOT NULL DEFAULT 'Amber',
+  owner TEXT,
+  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+  updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+-- Each list route filters on project_id and sorts by its order_by, so the
+-- index hands rows back already sorted. project_packages sorts by id, which
+-- every index carries as the rowid, so project_id alone covers it.
+CREATE INDEX IF NOT EXISTS idx_project_packages_pid ON project_packages(project_id);
+CREATE INDEX IF NOT EXISTS idx_project_milestones_pid_planned_date ON project_milestones(project_id, planned_date);
+CREATE INDEX IF NOT EXISTS idx_delay_reasons_pid_delay_date ON delay_reasons(project_id, delay_date DESC);
+CREATE INDEX IF NOT EXISTS idx_ra_bills_pid_bill_date ON ra_bills(project_id, bill_date DESC);
+CREATE INDEX IF NOT EXISTS idx_claims_variations_pid_submitted_date ON claims_variations(project_id, submitted_date DESC);
+CREATE INDEX IF NOT EXISTS idx_boq_items_pid_item_code ON boq_items(project_id, item_code);
+CREATE INDEX IF NOT EXISTS idx_quality_tests_pid_test_date ON quality_tests(project_id, test_date DESC);
+CREATE INDEX IF NOT EXISTS idx_ncrs_pid_raised_date ON ncrs(project_id, raised_date DESC);
+CREATE INDEX IF NOT EXISTS idx_safety_incidents_pid_incident_date ON safety_incidents(project_id, incident_date DESC);
+CREATE INDEX IF NOT EXISTS idx_labour_manpower_pid_record_date ON labour_manpower(project_id, record_date DESC);
+CREATE INDEX IF NOT EXISTS idx_plant_machinery_pid_record_date ON plant_machinery(project_id, record_date DESC);
+CREATE INDEX IF NOT EXISTS idx_material_inventory_pid_record_date ON material_inventory(project_id, record_date DESC);
+CREATE INDEX IF NOT EXISTS idx_drawings_approvals_pid_submitted_date ON drawings_approvals(project_id, submitted_date DESC);
+CREATE INDEX IF NOT EXISTS idx_railway_blocks_pid_block_date ON railway_blocks(project_id, block_date DESC);
+CREATE INDEX IF NOT EXISTS idx_risk_register_pid_risk_level ON risk_register(project_id, risk_level DESC);
+-- Superseded by the composite indexes above
+DROP INDEX IF EXISTS idx_project_milestones_pid;
+DROP INDEX IF EXISTS idx_delay_reasons_pid;
+DROP INDEX IF EXISTS idx_ra_bills_pid;
+DROP INDEX IF EXISTS idx_claims_variations_pid;
+DROP INDEX IF EXISTS idx_boq_items_pid;
+DROP INDEX IF EXISTS idx_quality_tests_pid;
+DROP INDEX IF EXISTS idx_ncrs_pid;
+DROP INDEX IF EXISTS idx_safety_incidents_pid;
+DROP INDEX IF EXISTS idx_labour_manpower_pid;
+DROP INDEX IF EXISTS idx_plant_machinery_pid;
+DROP INDEX IF EXISTS idx_material_inventory_pid;
+DROP INDEX IF EXISTS idx_drawings_approvals_pid;
+DROP INDEX IF EXISTS idx_railway_blocks_pid;
+DROP INDEX IF EXISTS idx_risk_register_pid;
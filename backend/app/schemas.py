@@ -12,6 +12,7 @@ class ProjectCreate(BaseModel):
     end_date: str | None = None
     total_contract_value: float | None = None
     profit_margin_target: float = 10.0
+    status: str = "Planning"
 
 
 class Project(ProjectCreate):
@@ -97,7 +98,8 @@ class DashboardSummary(BaseModel):
 
 class AiChatRequest(BaseModel):
     project_id: int
-    question: str
+    # Questions are a sentence or two; the project data goes in the context
+    question: str = Field(max_length=2000)
     from_date: str | None = None
     to_date: str | None = None
 
@@ -645,11 +647,11 @@ class ComprehensiveDashboard(BaseModel):
     project_id: int
     project_name: str
     client: str
-    progress_kpis: ProgressKPISummary
-    cost_billing_kpis: CostBillingKPISummary
-    quality_safety_kpis: QualitySafetyKPISummary
-    labour_productivity_kpis: LabourProductivityKPISummary
-    machinery_materials_kpis: MachineryMaterialsKPISummary
-    approvals_compliance_kpis: ApprovalsComplianceKPISummary
-    risk_stakeholder_kpis: RiskStakeholderKPISummary
+    progress_kpis: ProgressKPISummary | None = None
+    cost_billing_kpis: CostBillingKPISummary | None = None
+    quality_safety_kpis: QualitySafetyKPISummary | None = None
+    labour_productivity_kpis: LabourProductivityKPISummary | None = None
+    machinery_materials_kpis: MachineryMaterialsKPISummary | None = None
+    approvals_compliance_kpis: ApprovalsComplianceKPISummary | None = None
+    risk_stakeholder_kpis: RiskStakeholderKPISummary | None = None
 
@@ -1,11 +1,46 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import random
+import re
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
+from typing import AsyncIterator
 
 import httpx
+from pydantic_core import from_json, to_json
 
 from ..settings import settings
 
+# Completions are cached on a digest of the exact (model, system, user)
+# prompt. The user prompt embeds the project data extract, so new data means
+# a new key; the TTL only bounds how long a repeated question keeps its first
+# answer. Kept apart from app.cache so AI traffic neither evicts dashboard
+# entries nor gets dropped by their invalidations.
+AI_CACHE_TTL_SECONDS = 3600.0
+AI_CACHE_MAX_ENTRIES = 256
+
+# digest -> (expires_at, answer), in LRU order
+_answers: OrderedDict[str, tuple[float, str]] = OrderedDict()
+# digest -> future of the call currently fetching it, so identical questions
+# asked at the same time share one API call
+_answers_inflight: dict[str, asyncio.Future] = {}
+
+# Provider responses worth retrying. Attempts back off exponentially with
+# jitter (or honour Retry-After) but never sleep past the overall budget; once
+# it's spent answer() falls back to the offline summary.
+_RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+_MAX_ATTEMPTS = 3
+_RETRY_BUDGET_SECONDS = 10.0
+
+SYSTEM_PROMPT = (
+    "You are a construction planning and controls assistant for PWD/Indian Railways/MSRDC projects. "
+    "You help create DPR summaries, highlight risks, and explain cost/budget variance. "
+    "Be concise, use bullet points, and use site-appropriate terms (pile, pier, abutment, girder, deck slab)."
+)
+
 
 @dataclass
 class AiResult:
@@ -13,71 +48,228 @@ class AiResult:
     answer: str
 
 
+# Shared across requests so calls reuse pooled keep-alive connections instead
+# of paying a TCP + TLS handshake to the API each time. Created on first use so
+# it binds to the serving event loop.
+_client: httpx.AsyncClient | None = None
+
+
 def _has_key() -> bool:
     return bool(settings.openai_api_key and settings.openai_api_key.strip())
 
 
-async def chat_online(system_prompt: str, user_prompt: str) -> str:
-    """
-    Uses an OpenAI-compatible Chat Completions endpoint.
-    """
-    url = settings.openai_base_url.rstrip("/") + "/chat/completions"
-    headers = {"Authorization": f"Bearer {settings.openai_api_key}"}
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=settings.openai_base_url.rstrip("/"),
+            headers={
+                "Authorization": f"Bearer {settings.openai_api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=30,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        )
+    return _client
+
+
+async def aclose() -> None:
+    """Close the pooled client's connections (app shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _backoff(attempt: int, r: httpx.Response | None, deadline: float) -> bool:
+    """Sleep before the next attempt; False if it would overrun the budget"""
+    if attempt == _MAX_ATTEMPTS - 1:
+        return False
+    try:
+        delay = float(r.headers["Retry-After"])
+    except (AttributeError, KeyError, ValueError):
+        delay = 2 ** attempt * 0.5 + random.random() * 0.2
+    if time.monotonic() + delay > deadline:
+        return False
+    await asyncio.sleep(delay)
+    return True
+
+
+async def _post_with_retry(url: str, body: bytes) -> httpx.Response:
+    """POST body, retrying rate limits, 5xx and network errors"""
+    deadline = time.monotonic() + _RETRY_BUDGET_SECONDS
+    for attempt in range(_MAX_ATTEMPTS):
+        try:
+            r = await _get_client().post(url, content=body)
+        except httpx.TransportError:
+            if not await _backoff(attempt, None, deadline):
+                raise
+            continue
+        if r.status_code not in _RETRY_STATUSES or not await _backoff(attempt, r, deadline):
+            return r.raise_for_status()
+
+
+def _chat_body(system_prompt: str, user_prompt: str, stream: bool = False) -> bytes:
     payload = {
         "model": settings.openai_model,
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
-        "temperature": 0.2,
+        # Deterministic, so a cached answer is the one a new call would give
+        "temperature": 0,
     }
+    if stream:
+        payload["stream"] = True
+    return to_json(payload)
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post(url, headers=headers, json=payload)
-        r.raise_for_status()
-        data = r.json()
 
-    return (data.get("choices") or [{}])[0].get("message", {}).get("content", "").strip()
+async def chat_online(system_prompt: str, user_prompt: str) -> str:
+    """
+    Uses an OpenAI-compatible Chat Completions endpoint.
+    """
+    # pydantic-core encodes and parses without httpx's json.dumps/json.loads
+    r = await _post_with_retry("/chat/completions", _chat_body(system_prompt, user_prompt))
+    data = from_json(r.content)
+
+    content = (data.get("choices") or [{}])[0].get("message", {}).get("content", "").strip()
+    if not content:
+        # Raised rather than returned so an empty completion isn't cached
+        raise ValueError("empty completion")
+    return content
+
+
+# Substring matches ("overrun" counts as "over"), so each keyword list is one
+# precompiled alternation rather than a Python-level scan per keyword
+_BUDGET_KEYWORDS = re.compile("budget|variance|over|under|cost")
+_DPR_KEYWORDS = re.compile("dpr|daily|progress|today")
+
+_OFFLINE_HEADER = "Offline mode (no AI key). Here is a structured summary from your data:\n"
+_BUDGET_TIPS = (
+    "\nSuggested checks:\n"
+    "- Compare top cost heads vs budget (steel, cement/RMC, machinery, labour)\n"
+    "- Verify high-value bills and payment mode for cash flow\n"
+    "- Confirm quantities logged for pile boring/concreting match bills"
+)
+_DPR_TIPS = (
+    "\nDPR format tip:\n"
+    "- Mention location/chainage, activity, quantity, manpower, machinery, and constraints."
+)
 
 
 def offline_answer(question: str, context: str) -> str:
     q = question.lower()
-    lines: list[str] = []
-    lines.append("Offline mode (no AI key). Here is a structured summary from your data:\n")
-    lines.append(context)
-
-    if any(k in q for k in ["budget", "variance", "over", "under", "cost"]):
-        lines.append(
-            "\nSuggested checks:\n"
-            "- Compare top cost heads vs budget (steel, cement/RMC, machinery, labour)\n"
-            "- Verify high-value bills and payment mode for cash flow\n"
-            "- Confirm quantities logged for pile boring/concreting match bills"
-        )
-    if any(k in q for k in ["dpr", "daily", "progress", "today"]):
-        lines.append(
-            "\nDPR format tip:\n"
-            "- Mention location/chainage, activity, quantity, manpower, machinery, and constraints."
-        )
+    lines = [_OFFLINE_HEADER, context]
+
+    if _BUDGET_KEYWORDS.search(q):
+        lines.append(_BUDGET_TIPS)
+    if _DPR_KEYWORDS.search(q):
+        lines.append(_DPR_TIPS)
 
     return "\n".join(lines).strip()
 
 
+async def stream_online(system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+    """
+    Streams completion text deltas from the Chat Completions endpoint as the
+    model produces them. Not cached and not retried, unlike cached_chat_online.
+    """
+    body = _chat_body(system_prompt, user_prompt, stream=True)
+    async with _get_client().stream("POST", "/chat/completions", content=body) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data == "[DONE]":
+                break
+            delta = (from_json(data).get("choices") or [{}])[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+
+def _answer_key(system_prompt: str, user_prompt: str) -> str:
+    return hashlib.sha256(
+        f"{settings.openai_model}\0{system_prompt}\0{user_prompt}".encode()
+    ).hexdigest()
+
+
+async def cached_chat_online(system_prompt: str, user_prompt: str) -> str:
+    """chat_online behind the answer cache, with concurrent misses coalesced"""
+    key = _answer_key(system_prompt, user_prompt)
+    while True:
+        hit = _answers.get(key)
+        if hit is not None:
+            if hit[0] >= time.monotonic():
+                _answers.move_to_end(key)
+                return hit[1]
+            del _answers[key]
+        fut = _answers_inflight.get(key)
+        if fut is None:
+            break
+        try:
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            # The leading request was cancelled, not ours: try again
+            if fut.cancelled():
+                continue
+            raise
+
+    fut = _answers_inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        content = await chat_online(system_prompt, user_prompt)
+    except asyncio.CancelledError:
+        fut.cancel()
+        raise
+    except BaseException as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved when nobody was waiting
+        raise
+    else:
+        _answers[key] = (time.monotonic() + AI_CACHE_TTL_SECONDS, content)
+        _answers.move_to_end(key)
+        while len(_answers) > AI_CACHE_MAX_ENTRIES:
+            _answers.popitem(last=False)
+        fut.set_result(content)
+        return content
+    finally:
+        del _answers_inflight[key]
+
+
+def _user_prompt(question: str, context: str) -> str:
+    # The context comes first: follow-up questions about the same project and
+    # range then share everything up to the question, which providers with
+    # prompt-prefix caching only prefill once
+    return f"Project context (data extract):\n{context}\n\nQuestion:\n{question}"
+
+
 async def answer(question: str, context: str) -> AiResult:
-    system_prompt = (
-        "You are a construction planning and controls assistant for PWD/Indian Railways/MSRDC projects. "
-        "You help create DPR summaries, highlight risks, and explain cost/budget variance. "
-        "Be concise, use bullet points, and use site-appropriate terms (pile, pier, abutment, girder, deck slab)."
-    )
-    user_prompt = f"Question:\n{question}\n\nProject context (data extract):\n{context}"
+    user_prompt = _user_prompt(question, context)
 
     if not _has_key():
         return AiResult(mode="offline", answer=offline_answer(question, context))
 
     try:
-        content = await chat_online(system_prompt, user_prompt)
-        if not content:
-            return AiResult(mode="offline", answer=offline_answer(question, context))
+        content = await cached_chat_online(SYSTEM_PROMPT, user_prompt)
         return AiResult(mode="online", answer=content)
     except Exception:
         return AiResult(mode="offline", answer=offline_answer(question, context))
 
+
+async def answer_stream(question: str, context: str) -> AsyncIterator[AiResult]:
+    """Like answer(), but yields the online answer in pieces as it arrives.
+
+    Falls back to a single offline result if there's no key or the call fails
+    before the first piece; a failure mid-answer just ends the stream.
+    """
+    if _has_key():
+        started = False
+        try:
+            async for delta in stream_online(SYSTEM_PROMPT, _user_prompt(question, context)):
+                started = True
+                yield AiResult(mode="online", answer=delta)
+        except Exception:
+            pass
+        if started:
+            return
+    yield AiResult(mode="offline", answer=offline_answer(question, context))
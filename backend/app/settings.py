@@ -4,9 +4,30 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
-    # MongoDB Database
-    mongodb_url: str = "mongodb://localhost:27017"
+    # MongoDB Database (leave unset to use the SQL database below)
+    mongodb_url: str | None = None
     database_name: str = "construction_dashboard"
+    mongodb_max_pool_size: int = 200
+    mongodb_min_pool_size: int = 10
+    mongodb_max_idle_time_ms: int = 300_000
+    mongodb_max_connecting: int = 4
+    mongodb_server_selection_timeout_ms: int = 3000
+    # Let Beanie drop indexes no longer declared on a model (migrations only)
+    allow_index_management: bool = False
+
+    # SQL database (SQLite file, or PostgreSQL when DATABASE_URL is set)
+    database_path: str = "data/construction_dashboard.db"
+    database_url: str | None = None
+    sqlite_pool_size: int = 8
+    sqlite_cache_size_kib: int = 16_000
+    pg_pool_min_size: int = 2
+    pg_pool_max_size: int = 10
+
+    # Browser caching of GET responses. 0 means clients revalidate every time
+    # (and get a 304 when nothing changed). Above 0 they may reuse a response
+    # for that many seconds, and serve it stale for twice as long while
+    # refetching in the background.
+    http_cache_max_age: int = 0
 
     # OpenAI-compatible
     openai_api_key: str | None = None
@@ -5,9 +5,22 @@ from typing import Any
 
 
 def row_to_dict(row: sqlite3.Row) -> dict[str, Any]:
-    return {k: row[k] for k in row.keys()}
+    return dict(zip(row.keys(), row))
 
 
 def rows_to_dicts(rows: list[sqlite3.Row]) -> list[dict[str, Any]]:
-    return [row_to_dict(r) for r in rows]
+    if not rows:
+        return []
+    # Every row of a result set shares the same columns
+    keys = rows[0].keys()
+    return [dict(zip(keys, r)) for r in rows]
 
+
+def fetch_dicts(cur) -> list[dict[str, Any]]:
+    """Drain a cursor opened with row_factory=None into dicts.
+
+    Column names come from cursor.description once, so SQLite doesn't build
+    a Row object per result row; works the same on PostgreSQL cursors.
+    """
+    names = [d[0] for d in cur.description]
+    return [dict(zip(names, r)) for r in cur.fetchall()]